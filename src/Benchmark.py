@@ -1,6 +1,8 @@
 from src.Functions import Function
-from src.algorithms import DifferentialEvolution, FireflyAlgorithm, ParticleSwarmOptimization, TeachingLearningBasedOptimization, SelfOrganizingMigrationAlgorithm
-from src.utils.Utils import functions_call_counter, FunctionCallCounter
+from src.TransformedFunctions import TransformedSuite
+from src.algorithms import DifferentialEvolution, FireflyAlgorithm, ParticleSwarmOptimization, TeachingLearningBasedOptimization, SelfOrganizingMigrationAlgorithm, \
+    SimAnnealing
+from src.utils.Evaluator import evaluation_budget
 
 
 class Benchmark:
@@ -20,15 +22,26 @@ class Benchmark:
     - TeachingLearningBasedOptimization
     """
 
-    def __init__(self, NP: int = 30, max_calls: int = 3000, dimensions: int = 20, number_of_tests: int = 30):
+    def __init__(self, NP: int = 30, max_calls: int = 3000, dimensions: int = 20, number_of_tests: int = 30,
+                 shifted_rotated: bool = False, seed: int = 0):
+        """
+        :param NP: population size of all algorithms
+        :param max_calls: evaluation budget of one run
+        :param dimensions: dimension of the functions
+        :param number_of_tests: number of repeated tests
+        :param shifted_rotated: benchmark the shifted and rotated variants of the functions
+        :param seed: seed of the shifts and rotations
+        """
         self.max_calls = max_calls
         self.number_of_tests = number_of_tests
         self.functions = Function(dimensions)
+        if shifted_rotated:
+            self.functions = TransformedSuite(self.functions, seed)
         self.np = NP
         np = NP
         self.algorithms = [
             # BlindSearch(self.functions),
-            # SimAnnealing(self.functions),
+            SimAnnealing(self.functions, chains=10, schedule="budget"),
             # HillClimb(self.functions),
             DifferentialEvolution(self.functions, NP=np),
             FireflyAlgorithm(self.functions, NP=np),
@@ -40,23 +53,26 @@ class Benchmark:
         self.all_results: list[dict] = []
 
     def run(self):
-        FunctionCallCounter().set_max_calls(self.max_calls)
-        assert functions_call_counter.get_counts() == {}
+        # every run gets its own evaluator, which stops the run exactly at max_calls evaluations
+        evaluation_budget.set_max_calls(self.max_calls)
 
         print("Benchmark started")
 
-        for _ in range(self.number_of_tests):
-            print(f"Test {_ + 1}/{self.number_of_tests}")
-            results = {}
-            for algorithm in self.algorithms:
-                algorithm.result = {}
-                functions_call_counter.reset_counts()
-                assert functions_call_counter.get_counts() == {}
-                print(f"\tRunning {algorithm.__class__.__name__}", end=" ")
-                results[algorithm] = algorithm.run_all()
-                print("done")
-
-            self.all_results.append(results)
+        try:
+            for _ in range(self.number_of_tests):
+                print(f"Test {_ + 1}/{self.number_of_tests}")
+                results = {}
+                for algorithm in self.algorithms:
+                    algorithm.result = {}
+                    print(f"\tRunning {algorithm.__class__.__name__}", end=" ")
+                    results[algorithm] = algorithm.run_all()
+                    print("done")
+
+                self.all_results.append(results)
+        finally:
+            # worker processes of a parallel backend do not outlive the benchmark
+            if evaluation_budget.backend is not None:
+                evaluation_budget.backend.close()
 
         print("Benchmark finished")
 
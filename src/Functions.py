@@ -1,29 +1,85 @@
 # new class with all test functions which can be parametrized
 # Test functions - Sphere, Schwefel, Rosenbrock, Rastrigin, Griewangk, Levy, Michalewicz, Zakharov, Ackley,
+# every function accepts a single point (D,) or a whole population (NP, D) and then returns (NP,) values
 
 import math
 
 import numpy as np
 
-from src.utils.Utils import singleton, set_range, functions_call_counter
+from src.utils.Utils import set_range
+
+FUNCTION_NAMES = ["sphere", "schwefel", "rosenbrock", "rastrigin", "griewank", "levy", "michalewicz", "zakharov", "ackley"]
+
+
+class Objective:
+    """
+    One test function bound to one Function instance, with its own range and dimension
+    (algorithms read function.range, function.dimension and function.__name__)
+    """
+
+    def __init__(self, functions: 'Function', name: str, range: tuple[float, float]):
+        self.functions: Function = functions
+        self.method: callable = getattr(Function, name)
+        self.range: tuple[float, float] = range
+        self.dimension: int = functions.dimension
+        self.__name__: str = name
+
+    def __call__(self, xx: np.ndarray, *args, **kwargs) -> float | np.ndarray:
+        return self.method(self.functions, xx, *args, **kwargs)
+
+    def __repr__(self):
+        return f"{self.__name__}(D={self.dimension}, range={self.range})"
+
+    @property
+    def cache_key(self) -> str:
+        # everything the values depend on, objectives with equal keys share evaluation caches
+        return repr(self)
 
 
-@singleton
 class Function:
+    """
+    Set of all test functions for one dimension and range configuration
+    instances are independent, so more dimensions can be benchmarked in one process (even concurrently)
+    """
 
-    def __init__(self, dimension=2):
+    def __init__(self, dimension: int = 2, ranges: dict[str, tuple[float, float]] | None = None):
+        """
+        :param dimension: dimension of all functions
+        :param ranges: search domain per function name, default is the range set by @set_range
+        """
         self.dimension: int = dimension
+        ranges = ranges or {}
+
+        # constants reused by every call with points of this dimension
+        self.ii: np.ndarray = np.arange(1, dimension + 1)
+        self.sqrt_ii: np.ndarray = np.sqrt(self.ii)
+        self.half_ii: np.ndarray = 0.5 * self.ii
+        self.ii_over_pi: np.ndarray = self.ii / math.pi
 
-    def get_all(self):
-        functions = [self.sphere, self.schwefel, self.rosenbrock, self.rastrigin, self.griewank, self.levy, self.michalewicz, self.zakharov, self.ackley]
-        for func in functions:
-            func = func.__func__  # Access the function object
-            func.dimension = self.dimension  # Add the attribute to each function
-        return functions
+        self.functions: list[Objective] = []
+        for name in FUNCTION_NAMES:
+            objective = Objective(self, name, ranges.get(name, getattr(Function, name).range))
+            # instance attribute shadows the method, so Function(10).sphere is the bound objective
+            setattr(self, name, objective)
+            self.functions.append(objective)
+
+    def get_all(self) -> list[Objective]:
+        return self.functions
+
+    def indices(self, d: int) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        index vector 1..d and its derived constants, precomputed for the dimension of the instance
+        (points of other dimension, e.g. 2D render of 30D function, get them computed)
+        :param d: dimension of the evaluated points
+        :return: ii, sqrt(ii), 0.5 * ii, ii / pi
+        """
+        if d == self.dimension:
+            return self.ii, self.sqrt_ii, self.half_ii, self.ii_over_pi
+        ii = np.arange(1, d + 1)
+        return ii, np.sqrt(ii), 0.5 * ii, ii / math.pi
 
     @set_range((-50, 50))
-    @functions_call_counter.count_calls
-    def schwefel(self, xx: np.ndarray) -> float:
+    def schwefel(self, xx: np.ndarray) -> float | np.ndarray:
         """
         Description:
             - Dimensions: length of array xx
@@ -36,15 +92,15 @@ class Function:
 
         Global Minimum:
             - f(x*) = 0 at x* = (420.9687, 420.9687)
-        :param xx: -> np.array
-        :return: -> float
+        :param xx: -> np.array of shape (D,) or (NP, D)
+        :return: -> float, or np.array of shape (NP,) for a population
         """
-        d = len(xx)
-        return 418.9829 * d - np.sum(xx * np.sin(np.sqrt(np.abs(xx))))
+        xx = np.asarray(xx)
+        d = xx.shape[-1]
+        return 418.9829 * d - np.sum(xx * np.sin(np.sqrt(np.abs(xx))), axis=-1)
 
     @set_range((-5.12, 5.12))
-    @functions_call_counter.count_calls
-    def sphere(self, xx: np.ndarray) -> float:
+    def sphere(self, xx: np.ndarray) -> float | np.ndarray:
         """
         Description:
             - Dimensions: length of array xx
@@ -55,16 +111,14 @@ class Function:
         Input Domain:
             The function is usually evaluated on the hypercube xi ∈ [-5.12, 5.12], for all i = 1, …, d.
 
-        :param xx: -> np.array
-        :return: -> float
+        :param xx: -> np.array of shape (D,) or (NP, D)
+        :return: -> float, or np.array of shape (NP,) for a population
         """
-        return np.sum(xx ** 2)
-
-    # @functions_call_counter.count_calls
+        xx = np.asarray(xx)
+        return np.sum(xx ** 2, axis=-1)
 
     @set_range((-10, 10))
-    @functions_call_counter.count_calls
-    def rosenbrock(self, xx: np.ndarray) -> float:
+    def rosenbrock(self, xx: np.ndarray) -> float | np.ndarray:
         """
         Description:
             - Dimensions: length of array xx
@@ -80,19 +134,18 @@ class Function:
         Global Minimum:
             - f(x*) = 0 at x* = (1, …, 1)
 
-        :param xx: -> np.array
-        :return: -> float
+        :param xx: -> np.array of shape (D,) or (NP, D)
+        :return: -> float, or np.array of shape (NP,) for a population
         """
 
-        d = len(xx)
-        xi = xx[0:d - 1]
-        xnext = xx[1:d]
-        sum = np.sum(100 * (xnext - xi ** 2) ** 2 + (xi - 1) ** 2)
+        xx = np.asarray(xx)
+        xi = xx[..., :-1]
+        xnext = xx[..., 1:]
+        sum = np.sum(100 * (xnext - xi ** 2) ** 2 + (xi - 1) ** 2, axis=-1)
         return sum
 
     @set_range((-5.12, 5.12))
-    @functions_call_counter.count_calls
-    def rastrigin(self, xx: np.ndarray) -> float:
+    def rastrigin(self, xx: np.ndarray) -> float | np.ndarray:
         """
         Description:
             - Dimensions: length of array xx
@@ -105,15 +158,15 @@ class Function:
 
         Global Minimum:
             - f(x*) = 0 at x* = (0, …, 0)
-        :param xx:
-        :return:
+        :param xx: -> np.array of shape (D,) or (NP, D)
+        :return: -> float, or np.array of shape (NP,) for a population
         """
-        d = len(xx)
-        return 10 * d + np.sum(xx ** 2 - 10 * np.cos(2 * math.pi * xx))
+        xx = np.asarray(xx)
+        d = xx.shape[-1]
+        return 10 * d + np.sum(xx ** 2 - 10 * np.cos(2 * math.pi * xx), axis=-1)
 
     @set_range((-50, 50))
-    @functions_call_counter.count_calls
-    def griewank(self, xx: np.ndarray) -> float:
+    def griewank(self, xx: np.ndarray) -> float | np.ndarray:
         """
         Description:
             - Dimensions: length of array xx
@@ -129,17 +182,17 @@ class Function:
 
         Source:
             https://www.sfu.ca/~ssurjano/griewank.html
-        :param xx: -> np.array
-        :return: -> float
+        :param xx: -> np.array of shape (D,) or (NP, D)
+        :return: -> float, or np.array of shape (NP,) for a population
         """
-        ii = np.arange(1, len(xx) + 1)
-        sum = np.sum(xx ** 2 / 4000)
-        prod = np.prod(np.cos(xx / np.sqrt(ii)))
+        xx = np.asarray(xx)
+        _, sqrt_ii, _, _ = self.indices(xx.shape[-1])
+        sum = np.sum(xx ** 2 / 4000, axis=-1)
+        prod = np.prod(np.cos(xx / sqrt_ii), axis=-1)
         return sum - prod + 1
 
     @set_range((-10, 10))
-    @functions_call_counter.count_calls
-    def levy(self, xx: np.ndarray) -> float:
+    def levy(self, xx: np.ndarray) -> float | np.ndarray:
         """
         Description:
             - Dimensions: length of array xx
@@ -150,23 +203,22 @@ class Function:
 
         Source:
             https://www.sfu.ca/~ssurjano/Code/levyr.html
-        :param xx: -> np.array
-        :return: -> float
+        :param xx: -> np.array of shape (D,) or (NP, D)
+        :return: -> float, or np.array of shape (NP,) for a population
         """
 
-        d = len(xx)
+        xx = np.asarray(xx)
         w = 1 + (xx - 1) / 4
-        term1 = (np.sin(math.pi * w[0])) ** 2  # R <- (sin(pi*w[1]))^2
-        term3 = (w[d - 1] - 1) ** 2 * (
-                1 + (np.sin(2 * math.pi * w[d - 1])) ** 2)  # R <- (w[d]-1)^2*(1+(sin(2*pi*w[d]))^2)
-        wi = w[0:d - 1]
+        term1 = (np.sin(math.pi * w[..., 0])) ** 2  # R <- (sin(pi*w[1]))^2
+        term3 = (w[..., -1] - 1) ** 2 * (
+                1 + (np.sin(2 * math.pi * w[..., -1])) ** 2)  # R <- (w[d]-1)^2*(1+(sin(2*pi*w[d]))^2)
+        wi = w[..., :-1]
         sum = np.sum(
-            (wi - 1) ** 2 * (1 + 10 * (np.sin(math.pi * wi + 1)) ** 2))  # R <- sum((wi-1)^2*(1+10*(sin(pi*wi+1))^2))
+            (wi - 1) ** 2 * (1 + 10 * (np.sin(math.pi * wi + 1)) ** 2), axis=-1)  # R <- sum((wi-1)^2*(1+10*(sin(pi*wi+1))^2))
         return term1 + sum + term3
 
     @set_range((0, math.pi))
-    @functions_call_counter.count_calls
-    def michalewicz(self, xx: np.ndarray, m=10) -> float:
+    def michalewicz(self, xx: np.ndarray, m=10) -> float | np.ndarray:
         """
         Description:
             - Dimensions: length of array xx
@@ -184,18 +236,17 @@ class Function:
 
         Source:
             https://www.sfu.ca/~ssurjano/Code/michal.html
-        :param xx: -> np.array
+        :param xx: -> np.array of shape (D,) or (NP, D)
         :param m: -> int constant (optional with default value of 10)
-        :return: -> float
+        :return: -> float, or np.array of shape (NP,) for a population
         """
 
-        d = len(xx)
-        i = np.arange(d) + 1
-        return -np.sum(np.sin(xx) * np.sin(i * xx ** 2 / math.pi) ** (2 * m))
+        xx = np.asarray(xx)
+        _, _, _, i_over_pi = self.indices(xx.shape[-1])
+        return -np.sum(np.sin(xx) * np.sin(i_over_pi * xx ** 2) ** (2 * m), axis=-1)
 
     @set_range((-10, 10))
-    @functions_call_counter.count_calls
-    def zakharov(self, xx: np.ndarray) -> float:
+    def zakharov(self, xx: np.ndarray) -> float | np.ndarray:
         """
         Description:
             - Dimensions: length of array xx
@@ -208,19 +259,18 @@ class Function:
 
         Source:
             https://www.sfu.ca/~ssurjano/Code/zakharov.html
-        :param xx: -> np.array
-        :return: -> float
+        :param xx: -> np.array of shape (D,) or (NP, D)
+        :return: -> float, or np.array of shape (NP,) for a population
         """
 
-        d = len(xx)
-        i = np.arange(d) + 1
-        sum1 = np.sum(xx ** 2)
-        sum2 = np.sum(0.5 * i * xx)
+        xx = np.asarray(xx)
+        _, _, half_i, _ = self.indices(xx.shape[-1])
+        sum1 = np.sum(xx ** 2, axis=-1)
+        sum2 = np.sum(half_i * xx, axis=-1)
         return sum1 + sum2 ** 2 + sum2 ** 4
 
     @set_range((-32.768, 32.768))
-    @functions_call_counter.count_calls
-    def ackley(self, xx: np.ndarray, a=20, b=0.2, c=(2 * math.pi)) -> float:
+    def ackley(self, xx: np.ndarray, a=20, b=0.2, c=(2 * math.pi)) -> float | np.ndarray:
         """
         Description:
             - Dimensions: length of array xx
@@ -233,16 +283,17 @@ class Function:
 
         Source:
             https://www.sfu.ca/~ssurjano/Code/ackley.html
-        :param xx: -> np.array
+        :param xx: -> np.array of shape (D,) or (NP, D)
         :param a: -> float (optional with default value of 20)
         :param b: -> float (optional with default value of 0.2)
         :param c: -> float (optional with default value of 2 * math.pi)
-        :return: -> float
+        :return: -> float, or np.array of shape (NP,) for a population
         """
 
-        d = len(xx)
-        sum1 = np.sum(xx ** 2)
-        sum2 = np.sum(np.cos(c * xx))
+        xx = np.asarray(xx)
+        d = xx.shape[-1]
+        sum1 = np.sum(xx ** 2, axis=-1)
+        sum2 = np.sum(np.cos(c * xx), axis=-1)
         term1 = -a * np.exp(-b * np.sqrt(sum1 / d))
         term2 = -np.exp(sum2 / d)
         return term1 + term2 + a + math.exp(1)
@@ -0,0 +1,151 @@
+# CEC-style shifted and rotated variants of the test functions from Functions.py
+# f(x) = base(R (x - o) + x*) + bias, so the optimum moves from x* to the shift vector o
+
+import os
+import zlib
+
+import numpy as np
+
+from src.Functions import Function
+
+TRANSFORMS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "results", "transforms")
+
+# known optima x* of the base functions which are not in the origin
+BASE_OPTIMUM = {
+    "schwefel": 420.9687,
+    "rosenbrock": 1.0,
+    "levy": 1.0,
+}
+
+
+def michalewicz_optimum(dimension: int, m: int = 10) -> np.ndarray:
+    """
+    Optimum x* of michalewicz, it depends on the dimension and has no closed form
+    the function is separable, coordinate i maximizes sin(x) sin(i x^2 / pi)^(2m) on [0, pi]
+    its peaks lie at x = pi sqrt((k + 1/2) / i), the best one is refined by zooming grids
+
+    :param dimension: dimension of the instance
+    :param m: steepness of michalewicz
+    :return: x* (D,), f(x*) = -1.8013 for D = 2
+    """
+    optimum = np.empty(dimension)
+    for i in range(1, dimension + 1):
+        peaks = np.pi * np.sqrt((np.arange(i) + 0.5) / i)
+        x = peaks[np.argmax(np.sin(peaks))]
+        width = np.pi / (4 * i * x)
+        for _ in range(4):
+            grid = np.clip(np.linspace(x - width, x + width, 101), 0, np.pi)
+            x = grid[np.argmax(np.sin(grid) * np.sin(i * grid ** 2 / np.pi) ** (2 * m))]
+            width /= 25
+        optimum[i - 1] = x
+    return optimum
+
+
+def base_optimum(name: str, dimension: int) -> float | np.ndarray:
+    """
+    :return: optimum x* of the base function, a scalar when all its coordinates are equal
+    """
+    if name == "michalewicz":
+        return michalewicz_optimum(dimension)
+    return BASE_OPTIMUM.get(name, 0.0)
+
+
+def load_transform(name: str, dimension: int, seed: int, directory: str = TRANSFORMS_DIR) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Load shift vector and rotation matrix of one (function, dimension, seed) instance
+    they are generated only once, saved as .npy files and then loaded memory-mapped (read only)
+
+    :param name: name of the base function
+    :param dimension: dimension of the instance
+    :param seed: seed of the instance
+    :param directory: directory with the .npy files
+    :return: shift (D,) in [-0.8, 0.8] (scaled to the search domain by the caller) and orthogonal rotation (D, D)
+    """
+    prefix = os.path.join(directory, f"{name}_D{dimension}_s{seed}")
+    shift_path, rotation_path = prefix + "_shift.npy", prefix + "_rotation.npy"
+
+    if not (os.path.exists(shift_path) and os.path.exists(rotation_path)):
+        os.makedirs(directory, exist_ok=True)
+        rng = np.random.default_rng([seed, dimension, zlib.crc32(name.encode())])
+
+        # keep the shifted optimum inside 80 % of the search domain
+        shift = rng.uniform(-0.8, 0.8, dimension)
+
+        # Q from QR of gaussian matrix with fixed signs is uniformly distributed orthogonal matrix
+        q, r = np.linalg.qr(rng.standard_normal((dimension, dimension)))
+        rotation = q * np.sign(np.diag(r))
+
+        for path, array in ((shift_path, shift), (rotation_path, rotation)):
+            # write to temporary file first, so concurrent processes never load half written file
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, "wb") as file:
+                np.save(file, array)
+            os.replace(temporary, path)
+
+    return np.load(shift_path, mmap_mode="r"), np.load(rotation_path, mmap_mode="r")
+
+
+class TransformedFunction:
+    """
+    Shifted and rotated instance of one test function
+
+    accepts a single point (D,) or a whole population (NP, D), the population is transformed by one matmul
+    """
+
+    def __init__(self, function: callable, seed: int = 0, bias: float = 0.0, directory: str = TRANSFORMS_DIR):
+        """
+        :param function: base function (one of Function.get_all())
+        :param seed: seed of the shift and rotation
+        :param bias: value added to the base function
+        :param directory: directory with cached transforms
+        """
+        self.function: callable = function
+        self.range: tuple[float, float] = function.range
+        self.dimension: int = function.dimension
+        self.__name__: str = f"{function.__name__}_shifted_rotated_{seed}"
+        self.seed: int = seed
+        self.bias: float = bias
+        self.directory: str = directory
+        unit_shift, self.rotation = load_transform(function.__name__, self.dimension, seed, directory)
+        center, half = (self.range[0] + self.range[1]) / 2, (self.range[1] - self.range[0]) / 2
+        self.shift: np.ndarray = center + half * unit_shift
+        self.base_optimum: float | np.ndarray = base_optimum(function.__name__, self.dimension)
+
+    def __call__(self, xx: np.ndarray) -> float | np.ndarray:
+        # rows of xx are points, so R (x - o) for all of them is (xx - o) R^T
+        z = (np.asarray(xx) - self.shift) @ self.rotation.T + self.base_optimum
+        return self.function(z) + self.bias
+
+    @property
+    def cache_key(self) -> str | None:
+        base = getattr(self.function, "cache_key", None)
+        return None if base is None else f"{base}_shifted_rotated(seed={self.seed}, bias={self.bias})"
+
+    def __reduce__(self):
+        # worker processes map the cached .npy files again instead of receiving a copy of the rotation
+        return TransformedFunction, (self.function, self.seed, self.bias, self.directory)
+
+
+class TransformedSuite:
+    """
+    Shifted and rotated variants of all functions of Function
+    can be used everywhere in place of Function (algorithms only need get_all())
+    """
+
+    def __init__(self, functions: Function, seed: int = 0, directory: str = TRANSFORMS_DIR):
+        """
+        :param functions: Function with the base functions
+        :param seed: seed of all instances
+        :param directory: directory with cached transforms
+        """
+        self.functions: Function = functions
+        self.seed: int = seed
+        self.dimension: int = functions.dimension
+        # bias of i-th function is 100 * i like in CEC suites
+        self.transformed: list[TransformedFunction] = [
+            TransformedFunction(function, seed, 100.0 * (i + 1), directory)
+            for i, function in enumerate(functions.get_all())
+        ]
+
+    def get_all(self) -> list[TransformedFunction]:
+        return self.transformed
@@ -1,28 +1,43 @@
 import pickle
 import sys
-from copy import deepcopy
 
 import numpy as np
 
 from src.render.Render2D import Render2D
-from src.utils.Genetic import Point, Generation, Individual, Genetic
+from src.utils.Genetic import Point, Generation, Individual, Genetic, tour_costs
+from src.utils.LocalSearch import LocalSearch, nearest_neighbours
+from src.utils.Tsplib import TspInstance
 
-
-def generate_points(num_points: int,
-                    x_range: tuple[float, float] = (0, 10),
-                    y_range: tuple[float, float] = (0, 10)) -> list[Point]:
-    points = []
-    for i in range(num_points):
-        x = np.random.uniform(x_range[0], x_range[1])
-        y = np.random.uniform(y_range[0], y_range[1])
-        points.append(Point(x, y, chr(65 + i)))
-    return points
+VARIANTS = ["as", "mmas"]
 
 
 class AntColonyOptimization:
 
-    def __init__(self, cities: int = 50, ants: int = 100, generations: int = 100, alpha: float = 1.0, beta: float = 2.0, evaporation_rate: float = 0.5):
-        self.points: list[Point] = generate_points(cities)
+    def __init__(self, cities: int = 50, ants: int = 100, generations: int = 100, alpha: float = 1.0, beta: float = 2.0, evaporation_rate: float = 0.5,
+                 variant: str = "as", candidates: int | None = None, p_best: float = 0.05, local_search: bool = False,
+                 instance: TspInstance | None = None, recording: str = "full", interval: int = 10, capacity: int = 100):
+        """
+        :param cities: number of random cities, ignored with instance
+        :param ants: number of ants
+        :param generations: number of generations
+        :param alpha: weight of pheromone
+        :param beta: weight of visibility
+        :param evaporation_rate: rho
+        :param variant: one of VARIANTS, ant system (all ants deposit) or MAX-MIN ant system
+            (only best-so-far ant deposits, pheromone bounded by tau_min and tau_max)
+        :param candidates: number of nearest cities considered in each step, None for all cities
+        :param p_best: MAX-MIN probability of constructing the best tour once converged, sets tau_min
+        :param local_search: improve every constructed tour by 2-opt and Or-opt local search
+        :param instance: TSP instance (e.g. from load_tsplib), None for random cities
+        :param recording: which generations are kept in the result, one of RECORDINGS
+        :param interval: every interval-th generation is kept with recording every
+        :param capacity: number of last generations kept with recording ring
+        """
+        if variant not in VARIANTS:
+            raise ValueError(f"unknown variant {variant}, use one of {VARIANTS}")
+        self.instance: TspInstance = instance if instance is not None else TspInstance.random(cities)
+        self.points: list[Point] = self.instance.points()
+        cities = self.instance.dimension
         self.no_of_cities: int = cities
         self.ants: int = ants
         self.generations: int = generations
@@ -30,71 +45,137 @@ class AntColonyOptimization:
         self.beta: float = beta
         self.evaporation_rate: float = evaporation_rate
         self.pheromone: np.ndarray = np.ones((cities, cities))
-        self.result: Genetic = Genetic()
-
-    def distance(self, point1: Point, point2: Point) -> float:
-        return np.sqrt((point1.x - point2.x) ** 2 + (point1.y - point2.y) ** 2)
+        # pheromone is dense anyway, so are the distances
+        self.distances: np.ndarray = self.instance.distances(max_dense=None)
+        # eta^beta, visibility of the cities, computed once
+        self.heuristic: np.ndarray = np.divide(1.0, self.distances, out=np.zeros_like(self.distances),
+                                               where=self.distances > 0) ** beta
+        self.variant: str = variant
+        self.p_best: float = p_best
+        self.tau_min: float = 0.0
+        self.tau_max: float = np.inf
+        # k nearest cities of every city sorted by distance, None for all cities
+        self.neighbours: np.ndarray | None = None
+        if candidates is not None and candidates < cities - 1:
+            self.neighbours = nearest_neighbours(self.distances, candidates)
+        self.local_search: LocalSearch | None = None
+        if local_search:
+            self.local_search = LocalSearch(self.distances, self.neighbours if self.neighbours is not None else 10)
+        self.result: Genetic = Genetic(recording, interval, capacity)
 
     def initialize_pheromone(self):
         self.pheromone = np.ones((self.no_of_cities, self.no_of_cities))
 
+    def desirability(self) -> np.ndarray:
+        """
+        :return: tau^alpha * eta^beta of all edges (n, n), or only of the edges to the candidates (n, k)
+        """
+        if self.neighbours is None:
+            return self.pheromone ** self.alpha * self.heuristic
+        origins = np.arange(self.no_of_cities)[:, np.newaxis]
+        return self.pheromone[origins, self.neighbours] ** self.alpha * self.heuristic[origins, self.neighbours]
+
     def run(self) -> Genetic:
         self.initialize_pheromone()
         for _ in range(self.generations):
-            generation = Generation()
-            best_individual = self.result.get_best() if self.result.generations else None
-            for _ in range(self.ants):
-                individual = self.construct_solution()
-                individual.calculate_cost()
-                generation.add(individual)
+            best_individual = self.result.get_best() if self.result.best_gen is not None else None
+            tours = self.construct_solutions(self.desirability())
+            fitness = tour_costs(tours, self.distances)
+            if self.local_search is not None:
+                fitness = self.local_search.improve_all(tours, fitness)
+
+            generation = self.result.new_generation().add_tours(tours, fitness, self.points)
             if best_individual:
                 generation.add(best_individual)
-            self.update_pheromone(generation)
+            if self.variant == "mmas":
+                self.update_pheromone_bounded(generation.get_best(), first=best_individual is None)
+            else:
+                if best_individual:
+                    tours = np.vstack((tours, best_individual.tour))
+                    fitness = np.append(fitness, best_individual.fitness)
+                self.update_pheromone(tours, fitness)
             self.result.add(generation)
             self.print_progress()
         best_individual = self.result.get_best()
         print(f"\n\n\nBest individual fitness: {best_individual.fitness}")
         return self.result
 
-    def construct_solution(self) -> Individual:
-        individual = Individual()
-        unvisited = set(self.points)
-        current_point = np.random.choice(self.points)
-        individual.add(current_point)
-        unvisited.remove(current_point)
-        while unvisited:
-            next_point = self.select_next_point(current_point, unvisited)
-            individual.add(next_point)
-            unvisited.remove(next_point)
-            current_point = next_point
-
-        # add to individual feromones for visualization ()
-        feromones_copy = deepcopy(individual.feromones)
-        # filter paths under treshold 1.0-e2
-        feromones_copy[feromones_copy < 1.0e-2] = 0
-        # for each 
-
-        return individual
+    def construct_solutions(self, choice: np.ndarray) -> np.ndarray:
+        """
+        Construct tours of all ants at once, every step each ant picks its next city by roulette over cumulative sums
+        with candidate lists ants choose among the unvisited candidates and fall back to all unvisited cities
+        only when all candidates of their current city were visited
+        :param choice: desirability of the edges, see desirability()
+        :return: tours (ants, n)
+        """
+        rows = np.arange(self.ants)
+        tours = np.empty((self.ants, self.no_of_cities), dtype=np.int32)
+        visited = np.zeros((self.ants, self.no_of_cities), dtype=bool)
+        current = np.random.randint(self.no_of_cities, size=self.ants)
+        tours[:, 0] = current
+        visited[rows, current] = True
+
+        for step in range(1, self.no_of_cities):
+            if self.neighbours is None:
+                current = self.roulette(choice[current], visited)
+            else:
+                candidates = self.neighbours[current]
+                open_ = ~visited[rows[:, np.newaxis], candidates]
+                nearby = np.any(open_, axis=1)
+                following = np.empty(self.ants, dtype=np.int64)
+                picked = self.roulette(choice[current[nearby]], ~open_[nearby])
+                following[nearby] = candidates[nearby, picked]
+                if not np.all(nearby):
+                    far = current[~nearby]
+                    following[~nearby] = self.roulette(self.pheromone[far] ** self.alpha * self.heuristic[far],
+                                                       visited[~nearby])
+                current = following
+            tours[:, step] = current
+            visited[rows, current] = True
+
+        return tours
 
-    def select_next_point(self, current_point: Point, unvisited: set) -> Point:
-        current_index = self.points.index(current_point)
-        unvisited_indices = [self.points.index(point) for point in unvisited]
-
-        tau = self.pheromone[current_index, unvisited_indices] ** self.alpha
-        distances = np.array([self.distance(current_point, self.points[i]) for i in unvisited_indices])
-        eta = (1 / distances) ** self.beta
-
-        probabilities = tau * eta
-        probabilities /= probabilities.sum()
-
-        return np.random.choice(list(unvisited), p=probabilities)
+    @staticmethod
+    def roulette(weights: np.ndarray, excluded: np.ndarray) -> np.ndarray:
+        """
+        :param weights: weights of the choices of every ant (ants, k)
+        :param excluded: mask of choices which can not be picked (ants, k)
+        :return: index of the picked choice of every ant (ants,)
+        """
+        cumulative = np.cumsum(np.where(excluded, 0.0, weights), axis=1)
+        # all weights of an ant underflowed, pick uniformly among its allowed choices
+        stuck = cumulative[:, -1] <= 0
+        if np.any(stuck):
+            cumulative[stuck] = np.cumsum(~excluded[stuck], axis=1)
+        threshold = np.random.rand(len(weights)) * cumulative[:, -1]
+        return np.argmax(cumulative > threshold[:, np.newaxis], axis=1)
+
+    def update_pheromone(self, tours: np.ndarray, fitness: np.ndarray):
+        """
+        :param tours: tours of all ants (ants, n)
+        :param fitness: lengths of the tours (ants,)
+        """
+        self.pheromone *= (1 - self.evaporation_rate)
+        # repeated edges of different ants have to accumulate, so add.at instead of +=
+        np.add.at(self.pheromone, (tours[:, :-1], tours[:, 1:]), (1 / fitness)[:, np.newaxis])
+
+    def update_pheromone_bounded(self, best: Individual, first: bool = False):
+        """
+        MAX-MIN update, only the best-so-far tour deposits and pheromone stays in [tau_min, tau_max]
+        :param best: best-so-far individual
+        :param first: first generation, pheromone starts at tau_max
+        """
+        n = self.no_of_cities
+        self.tau_max = 1 / (self.evaporation_rate * best.fitness)
+        root = self.p_best ** (1 / n)
+        self.tau_min = min(self.tau_max * (1 - root) / ((n / 2 - 1) * root), self.tau_max)
+        if first:
+            self.pheromone.fill(self.tau_max)
 
-    def update_pheromone(self, generation: Generation):
         self.pheromone *= (1 - self.evaporation_rate)
-        for individual in generation.individuals:
-            indices = [self.points.index(point) for point in individual.points]
-            for i in range(len(indices) - 1):
-                self.pheromone[indices[i], indices[i + 1]] += 1 / individual.fitness
+        # edges of one tour are distinct, so plain fancy indexing is enough
+        self.pheromone[best.tour[:-1], best.tour[1:]] += 1 / best.fitness
+        np.clip(self.pheromone, self.tau_min, self.tau_max, out=self.pheromone)
 
     def print_matrix(self, matrix: np.ndarray) -> list[str]:
         with np.printoptions(precision=2, suppress=False, threshold=np.inf, linewidth=250):
@@ -106,7 +187,7 @@ class AntColonyOptimization:
             sys.stdout.write(string + '\n')
 
     def print_progress(self):
-        progress = len(self.result.generations) / self.generations
+        progress = self.result.count / self.generations
         bar_length = 100
         filled_length = int(bar_length * progress)
         bar = '#' * filled_length + '.' * (bar_length - filled_length)
@@ -114,7 +195,7 @@ class AntColonyOptimization:
         line = f'[{bar}]  {percent.rjust(5, " ")}'
         sys.stdout.write('\r')
         sys.stdout.write(line)
-        # lines = [line, f'Generation: {len(self.result.generations)} / {self.generations}']
+        # lines = [line, f'Generation: {self.result.count} / {self.generations}']
         # matrix_lines = self.print_matrix(self.pheromone)
         # os.system('clear')
         # self.print_multiline_string(lines + matrix_lines)
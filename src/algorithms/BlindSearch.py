@@ -1,31 +1,82 @@
 from src.Functions import Function
 from src.render.Render3D import *
+from src.utils.Evaluator import evaluation_budget, BudgetExhausted
 from src.utils.Result import *
+from src.utils.Sequences import SEQUENCES
+
+SAMPLERS = ["uniform", *SEQUENCES]
 
 
 class BlindSearch:
 
-    def __init__(self, functions: Function, repeat_count: int = 10, population: int = 100):
+    def __init__(self, functions: Function, repeat_count: int = 10, population: int = 100,
+                 chunk: int | None = None, streaming: bool = False, top_k: int = 1, sampler: str = "uniform",
+                 seed: int | None = None, randomized: bool = True):
+        """
+
+        :param functions:
+        :param repeat_count: number of iterations
+        :param population: number of points per iteration
+        :param chunk: number of points sampled and evaluated at once, None for the population
+        :param streaming: keep only the running best (and top_k) positions instead of every sampled point,
+            memory stays constant regardless of the number of samples
+        :param top_k: number of best positions kept in streaming mode
+        :param sampler: one of SAMPLERS, uniform random or low discrepancy sequence
+        :param seed: seed of the randomization of the low discrepancy sequences, None for a random one
+        :param randomized: False for the plain low discrepancy sequences, which start in the centre of the domain
+        """
+        if sampler not in SAMPLERS:
+            raise ValueError(f"unknown sampler {sampler}, use one of {SAMPLERS}")
         self.functions: Function = functions
         self.repeat_count: int = repeat_count  # Number of iterations
         self.population: int = population  # Number of particles
+        self.chunk: int = chunk or population
+        self.streaming: bool = streaming
+        self.top_k: int = top_k
+        self.sampler: str = sampler
+        self.seed: int | None = seed
+        self.randomized: bool = randomized
         self.best = np.inf
         self.result: dict[callable, Result] = {}
 
+    def sample(self, function: callable, sequence, n: int) -> ndarray:
+        """
+        :return: n points (n, D) in the range of the function
+        """
+        if sequence is None:
+            return np.random.uniform(low=function.range[0], high=function.range[1], size=(n, function.dimension))
+        return function.range[0] + (function.range[1] - function.range[0]) * sequence.sample(n)
+
     def run_function(self, function: callable) -> Result:
+        evaluate = evaluation_budget.evaluator(function)
+        sequence = SEQUENCES[self.sampler](function.dimension, self.seed, self.randomized) if self.sampler != "uniform" else None
         iteration = Iteration()
-        local_best = np.inf
-        for i in range(self.repeat_count):
-            for j in range(self.population):
+        # running top k of the streaming mode
+        best_values = np.full(self.top_k, np.inf)
+        best_positions = np.zeros((self.top_k, function.dimension))
+        try:
+            remaining = self.repeat_count * self.population
+            while remaining > 0:
+                xx = self.sample(function, sequence, min(self.chunk, remaining))
+                remaining -= len(xx)
+                z = evaluate(xx)
 
-                xx = np.random.uniform(low=function.range[0], high=function.range[1], size=function.dimension)
-                result = function(xx)
-                iteration.add_position(Position(result, xx))
+                if not self.streaming:
+                    iteration.add_population(z, xx)
+                    continue
 
-                if result < local_best:
-                    local_best = result
-                    iteration.set_best(Position(result, xx))
+                # merge top k of the chunk into the running top k
+                if len(z) > self.top_k:
+                    candidates = np.argpartition(z, self.top_k)[:self.top_k]
+                    z, xx = z[candidates], xx[candidates]
+                values = np.concatenate((best_values, z))
+                keep = np.argsort(values)[:self.top_k]
+                best_values, best_positions = values[keep], np.concatenate((best_positions, xx))[keep]
+        except BudgetExhausted:
+            pass
 
+        if self.streaming:
+            iteration.add_population(best_values[::-1], best_positions[::-1])
         return Result().add_iteration(iteration)
 
     def run_all(self) -> dict[callable, Result]:
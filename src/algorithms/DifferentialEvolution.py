@@ -1,88 +1,124 @@
-from copy import deepcopy
-
 from src.Functions import Function
 from src.render.Render3D import *
 from src.utils.Result import *
-from src.utils.Utils import functions_call_counter
-
+from src.utils.Evaluator import evaluation_budget, BudgetExhausted
 
-def evaluate_population(population: list[ndarray], function: callable) -> Position:
-    best_value = np.inf
-    best_position = None
-    for pos in population:
-        value = function(pos)
-        if value < best_value:
-            best_value = value
-            best_position = pos
-    return Position(best_value, best_position)
+# number of random individuals needed by each mutation strategy
+STRATEGIES = {
+    "rand/1": 3,
+    "best/1": 2,
+    "current-to-best/1": 2,
+    "rand/2": 5,
+}
+CROSSOVERS = ["bin", "exp"]
 
 
 class DifferentialEvolution:
     def __init__(self, functions: Function, NP: int = 20, F: float = 0.5, CR: float = 0.5, g_maxim: int = 50,
-                 treshold: float = 1e-4):
+                 treshold: float = 1e-4, strategy: str = "rand/1/bin"):
+        """
+        :param functions:
+        :param NP: number of individuals in the population
+        :param F: mutation constant
+        :param CR: crossover rate
+        :param g_maxim: maximum number of generations
+        :param treshold:
+        :param strategy: mutation/crossover as "rand/1", "best/1", "current-to-best/1" or "rand/2" with "/bin" or "/exp"
+        """
+        mutation, _, crossover = strategy.rpartition("/")
+        if mutation not in STRATEGIES or crossover not in CROSSOVERS:
+            raise ValueError(f"unknown strategy {strategy}, use one of {list(STRATEGIES)} with /bin or /exp")
+        if NP <= STRATEGIES[mutation]:
+            raise ValueError(f"strategy {strategy} needs NP > {STRATEGIES[mutation]}")
+
         self.treshold = treshold
         self.NP = NP
         self.F = F
         self.CR = CR
         self.g_maxim = g_maxim
+        self.mutation: str = mutation
+        self.crossover: str = crossover
         self.functions: Function = functions
         self.result: dict[callable, Result] = {}
 
-    def generate_population(self, fn: callable, dimension: int):
-        return [np.random.uniform(fn.range[0], fn.range[1], dimension) for _ in range(self.NP)]
-
-    def select_random_indices(self, exclude_index: int) -> tuple[int, int, int]:
-        indices = list(range(self.NP))
-        indices.remove(exclude_index)
-        return np.random.choice(indices, 3, replace=False)
+    def generate_population(self, fn: callable, dimension: int) -> ndarray:
+        return np.random.uniform(fn.range[0], fn.range[1], (self.NP, dimension))
+
+    def select_random_indices(self, count: int) -> ndarray:
+        """
+        :param count: number of indices per individual
+        :return: (NP, count) distinct indices in every row, row i never contains i
+        """
+        keys = np.random.rand(self.NP, self.NP)
+        # own index gets the biggest key, so it is sorted after all the others
+        np.fill_diagonal(keys, 2.0)
+        return np.argsort(keys, axis=1)[:, :count]
+
+    def mutate(self, pop: ndarray, fitness: ndarray) -> ndarray:
+        r = self.select_random_indices(STRATEGIES[self.mutation])
+        if self.mutation == "rand/1":
+            return pop[r[:, 0]] + self.F * (pop[r[:, 1]] - pop[r[:, 2]])
+        best = pop[np.argmin(fitness)]
+        if self.mutation == "best/1":
+            return best + self.F * (pop[r[:, 0]] - pop[r[:, 1]])
+        if self.mutation == "current-to-best/1":
+            return pop + self.F * (best - pop) + self.F * (pop[r[:, 0]] - pop[r[:, 1]])
+        return pop[r[:, 0]] + self.F * (pop[r[:, 1]] - pop[r[:, 2]]) + self.F * (pop[r[:, 3]] - pop[r[:, 4]])
+
+    def crossover_mask(self, dimension: int) -> ndarray:
+        """
+        :return: (NP, D) mask of parameters taken from the mutant vector
+        """
+        j_rnd = np.random.randint(0, dimension, self.NP)
+        if self.crossover == "bin":
+            mask = np.random.rand(self.NP, dimension) < self.CR
+            mask[np.arange(self.NP), j_rnd] = True
+            return mask
+
+        # exp: L consecutive parameters (cyclically) from j_rnd, L = 1 + number of successes before first failure
+        successes = np.random.rand(self.NP, dimension) < self.CR
+        successes[:, -1] = False
+        length = 1 + np.argmin(successes, axis=1)
+        offset = (np.arange(dimension) - j_rnd[:, np.newaxis]) % dimension
+        return offset < length[:, np.newaxis]
 
     def run_function(self, function: callable) -> Result:
+        evaluate = evaluation_budget.evaluator(function)
         dimension = function.dimension
-        pop = self.generate_population(function, dimension)
+        pop = evaluate.empty((self.NP, dimension))
+        pop[:] = self.generate_population(function, dimension)
+        trial = evaluate.empty((self.NP, dimension))
         g = 0
         result = Result()
+        iteration = Iteration()
 
-        while g < self.g_maxim and functions_call_counter.get_counts(function) < functions_call_counter.get_max_calls():
-            new_pop = deepcopy(pop)
-
-            iteration = Iteration()
+        try:
+            fitness = evaluate(pop)
 
-            for i, x in enumerate(pop):
-                r1, r2, r3 = self.select_random_indices(i)
-                v = (pop[r1] - pop[r2]) * self.F + pop[r3]
+            while g < self.g_maxim:
+                iteration = Iteration()
 
-                v = np.maximum(v, function.range[0])
-                v = np.minimum(v, function.range[1])
+                mutant = np.clip(self.mutate(pop, fitness), function.range[0], function.range[1])
+                trial[:] = np.where(self.crossover_mask(dimension), mutant, pop)
 
-                u = np.zeros(dimension)
-                j_rnd = np.random.randint(0, dimension)
+                f_trial = evaluate(trial)
 
-                for j in range(dimension):
-                    if np.random.uniform() < self.CR or j == j_rnd:
-                        u[j] = v[j]
-                    else:
-                        u[j] = x[j]
+                improved = f_trial <= fitness
+                pop[improved] = trial[improved]
+                fitness[improved] = f_trial[improved]
 
-                f_u = function(u)
+                iteration.add_population(f_trial, trial)
+                best = np.argmin(fitness)
+                iteration.add_position(Position(fitness[best], pop[best].copy()))
 
-                if f_u <= function(x):
-                    new_pop[i] = u
-
-                pop = new_pop
-                iteration.add_position(Position(f_u, u))
+                g += 1
 
                 # if iteration.best.value < self.treshold:
                 #    break
 
-            best_position = evaluate_population(pop, function)
-            iteration.add_position(best_position)
-
-            g += 1
-
-            # if iteration.best.value < self.treshold:
-            #    break
-
-            result.add_iteration(iteration)
+                result.add_iteration(iteration)
+        except BudgetExhausted as exhausted:
+            result.add_iteration(iteration.add_position(exhausted.best))
 
         self.result[function] = result
         return self.result[function]
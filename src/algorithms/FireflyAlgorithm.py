@@ -1,23 +1,12 @@
 from src.Functions import Function
 from src.render.Render3D import *
 from src.utils.Result import *
-from src.utils.Utils import functions_call_counter
-
-
-def evaluate_population(population: list[ndarray], function: callable) -> Position:
-    best_value = np.inf
-    best_position = None
-    for pos in population:
-        value = function(pos)
-        if value < best_value:
-            best_value = value
-            best_position = pos
-    return Position(best_value, best_position)
+from src.utils.Evaluator import evaluation_budget, BudgetExhausted
 
 
 class FireflyAlgorithm:
     def __init__(self, functions: Function, NP: int = 100, alpha: float = 0.3, beta: float = 1.0, gamma: float = 1.0,
-                 g_maxim: int = 30, ):
+                 g_maxim: int = 30, tile: int = 1024):
         """
 
         :param functions:
@@ -26,6 +15,7 @@ class FireflyAlgorithm:
         :param beta:
         :param gamma:
         :param g_maxim:
+        :param tile: number of fireflies whose pairwise distances are computed at once (bounds memory to tile x NP)
         """
 
         self.NP = NP
@@ -33,45 +23,70 @@ class FireflyAlgorithm:
         self.beta = beta
         self.gamma = gamma
         self.g_maxim = g_maxim
+        self.tile = tile
         self.functions: Function = functions
         self.result: dict[callable, Result] = {}
 
-    def generate_population(self, fn: callable, dimension: int):
-        return [np.random.uniform(fn.range[0], fn.range[1], dimension) for _ in range(self.NP)]
+    def generate_population(self, fn: callable, dimension: int) -> ndarray:
+        return np.random.uniform(fn.range[0], fn.range[1], (self.NP, dimension))
 
-    def attractiveness(self, distance: float) -> float:
-        return self.beta * np.exp(-self.gamma * distance ** 2)
+    def attractiveness(self, squared_distance: ndarray) -> ndarray:
+        return self.beta * np.exp(-self.gamma * squared_distance)
+
+    def moves(self, pop: ndarray, brightness: ndarray) -> tuple[ndarray, ndarray]:
+        """
+        Moves of all fireflies toward all brighter ones, computed in tiles of rows
+        the attractions of one firefly are summed, if they sum over 1 they are normalized,
+        so the moved firefly stays in the convex hull of itself and the brighter ones (like the sequential moves)
+        :return: (NP, D) moves without the random step and (NP,) mask of fireflies with a brighter one
+        """
+        squared_norms = np.sum(pop ** 2, axis=1)
+        moves = np.zeros_like(pop)
+        attracted = np.zeros(len(pop), dtype=bool)
+        for start in range(0, len(pop), self.tile):
+            rows = slice(start, start + self.tile)
+            squared_distance = np.maximum(squared_norms[rows, np.newaxis] + squared_norms - 2 * pop[rows] @ pop.T, 0)
+            weights = np.where(brightness[rows, np.newaxis] > brightness, self.attractiveness(squared_distance), 0.0)
+            total = weights.sum(axis=1)
+            weights /= np.maximum(total, 1.0)[:, np.newaxis]
+            moves[rows] = weights @ pop - weights.sum(axis=1)[:, np.newaxis] * pop[rows]
+            attracted[rows] = np.any(brightness[rows, np.newaxis] > brightness, axis=1)
+        return moves, attracted
 
     def run_function(self, function: callable) -> Result:
+        evaluate = evaluation_budget.evaluator(function)
         dimension = function.dimension
-        pop = self.generate_population(function, dimension)
-        brightness = [function(pos) for pos in pop]
+        pop = evaluate.empty((self.NP, dimension))
+        pop[:] = self.generate_population(function, dimension)
         g = 0
         result = Result()
+        iteration = Iteration()
 
-        while g < self.g_maxim and functions_call_counter.get_counts(function) < functions_call_counter.get_max_calls():
-            iteration = Iteration()
+        try:
+            brightness = evaluate(pop)
 
-            for i in range(self.NP):
-                for j in range(self.NP):
-                    if brightness[i] > brightness[j]:
-                        distance = np.linalg.norm(pop[i] - pop[j])
-                        beta = self.attractiveness(distance)
+            while g < self.g_maxim:
+                iteration = Iteration()
 
-                        pop[i] = np.clip(pop[i] + beta * (pop[j] - pop[i]) + self.alpha * (np.random.rand(dimension) - 0.5),
+                moves, attracted = self.moves(pop, brightness)
+                random_step = self.alpha * (np.random.rand(self.NP, dimension) - 0.5)
+                pop[attracted] = np.clip(pop[attracted] + moves[attracted] + random_step[attracted],
                                          function.range[0],
                                          function.range[1])
 
-                        brightness[i] = function(pop[i])
-
-                iteration.add_position(Position(brightness[i], pop[i]))
-
-            best_position = evaluate_population(pop, function)
-            iteration.add_position(best_position)
+                # only the moved fireflies changed, the brightest ones keep their cached brightness
+                moved = np.flatnonzero(attracted)
+                if moved.size:
+                    brightness[moved] = evaluate(pop[moved])
+                    iteration.add_population(brightness[moved], pop[moved])
+                best = np.argmin(brightness)
+                iteration.add_position(Position(brightness[best], pop[best].copy()))
 
-            g += 1
+                g += 1
 
-            result.add_iteration(iteration)
+                result.add_iteration(iteration)
+        except BudgetExhausted as exhausted:
+            result.add_iteration(iteration.add_position(exhausted.best))
 
         self.result[function] = result
         return self.result[function]
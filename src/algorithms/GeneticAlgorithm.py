@@ -1,63 +1,130 @@
 import pickle
 import sys
-from copy import copy
 
 import numpy as np
 
 from src.render.Render2D import Render2D
-from src.utils.Genetic import Genetic, Point, Generation, Individual
+from src.utils.Genetic import Genetic, Point, Generation, Individual, tour_costs
+from src.utils.LocalSearch import LocalSearch
+from src.utils.Moves import swap_delta, apply_swap, two_opt_delta, apply_two_opt, or_opt_delta, apply_or_opt
+from src.utils.Tsplib import TspInstance
 
-
-def generate_points(num_points: int,
-                    x_range: tuple[float, float] = (0, 10),
-                    y_range: tuple[float, float] = (0, 10)) -> list[Point]:
-    points = []
-    for i in range(num_points):
-        x = np.random.uniform(x_range[0], x_range[1])
-        y = np.random.uniform(y_range[0], y_range[1])
-        points.append(Point(x, y, chr(65 + i)))
-    return points
+MUTATIONS = ["swap", "two-opt", "insertion", "or-opt"]
 
 
 class GeneticAlgorithm:
 
-    def __init__(self, cities: int = 10, population: int = 100, generations: int = 100, mutation_rate: float = 0.5):
-        self.points: list[Point] = generate_points(cities)  # D number of "cities"
-        self.no_of_cities: int = cities
+    def __init__(self, cities: int = 10, population: int = 100, generations: int = 100, mutation_rate: float = 0.5,
+                 mutation: str = "swap", memetic: bool = False, neighbours: int = 10, instance: TspInstance | None = None,
+                 recording: str = "full", interval: int = 10, capacity: int = 100):
+        """
+        :param cities: number of random cities, ignored with instance
+        :param population: size of population
+        :param generations: number of generations
+        :param mutation_rate: probability of mutation of a child
+        :param mutation: mutation operator, one of MUTATIONS
+        :param memetic: improve every child by 2-opt and Or-opt local search
+        :param neighbours: number of nearest neighbours considered by the local search
+        :param instance: TSP instance (e.g. from load_tsplib), None for random cities
+        :param recording: which generations are kept in the result, one of RECORDINGS
+        :param interval: every interval-th generation is kept with recording every
+        :param capacity: number of last generations kept with recording ring
+        """
+        if mutation not in MUTATIONS:
+            raise ValueError(f"unknown mutation {mutation}, use one of {MUTATIONS}")
+        self.instance: TspInstance = instance if instance is not None else TspInstance.random(cities)
+        self.points: list[Point] = self.instance.points()  # D number of "cities"
+        self.no_of_cities: int = self.instance.dimension
         self.population_size: int = population  # NP size of population
         self.generations: int = generations  # G
         self.mutation_rate: float = mutation_rate
-        self.result: Genetic = Genetic()
-
-    def generate_generation(self) -> Generation:
-        generation = Generation()
-        for _ in range(self.population_size):
-            individual = Individual()
-            for point in self.points:
-                individual.add(point)
-            individual.calculate_cost()
-            generation.add(individual)
-
-        return generation
-
-    def crossover(self, parent1: Individual, parent2: Individual) -> Individual:
-        child = Individual()
-        start, end = sorted(np.random.choice(range(self.no_of_cities), 2, replace=False))
-        child.points = parent1.points[start:end]
-        for point in parent2.points:
-            if point not in child.points:
-                child.add(point)
-        child.calculate_cost()
-        return child
-
-    def mutate(self, individual: Individual):
-        if np.random.rand() < self.mutation_rate:
-            idx1, idx2 = np.random.choice(range(self.no_of_cities), 2, replace=False)
-            individual.points[idx1], individual.points[idx2] = individual.points[idx2], individual.points[idx1]
-            individual.calculate_cost()
+        self.mutation: str = mutation
+        # dense matrix, or computed lazily for large instances
+        self.distances = self.instance.distances()
+        self.local_search: LocalSearch | None = LocalSearch(self.distances, neighbours) if memetic else None
+        self.result: Genetic = Genetic(recording, interval, capacity)
+
+    def generate_population(self) -> np.ndarray:
+        """
+        :return: random tours (NP, n) of city indices
+        """
+        return np.argsort(np.random.rand(self.population_size, self.no_of_cities), axis=1).astype(np.int32)
+
+    def record(self, population: np.ndarray, fitness: np.ndarray) -> Generation:
+        return self.result.new_generation().add_tours(population, fitness, self.points)
+
+    @staticmethod
+    def distinct_positions(count: int, n: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Two distinct random positions of every tour, drawn directly in O(1) per tour
+        :return: positions i < j (count,) and (count,)
+        """
+        i = np.random.randint(n, size=count)
+        j = (i + np.random.randint(1, max(n, 2), size=count)) % n
+        return np.minimum(i, j), np.maximum(i, j)
+
+    def crossover(self, parents1: np.ndarray, parents2: np.ndarray) -> np.ndarray:
+        """
+        Order crossover of whole populations
+        child starts with a random segment of parent1 followed by the remaining cities in the order of parent2
+        :param parents1: tours (NP, n)
+        :param parents2: tours (NP, n)
+        :return: children (NP, n)
+        """
+        count, n = parents1.shape
+        start, stop = self.distinct_positions(count, n)
+        positions = np.arange(n)
+        segment = (positions >= start[:, np.newaxis]) & (positions < stop[:, np.newaxis])
+
+        # membership of the cities in the segment of parent1
+        member = np.zeros((count, n), dtype=bool)
+        rows, columns = np.nonzero(segment)
+        member[rows, parents1[rows, columns]] = True
+        rest = ~np.take_along_axis(member, parents2, axis=1)
+
+        # every row selects exactly n cities, segment first then the rest of parent2
+        mask = np.concatenate((segment, rest), axis=1)
+        return np.concatenate((parents1, parents2), axis=1)[mask].reshape(count, n)
+
+    def mutate(self, population: np.ndarray, costs: np.ndarray) -> np.ndarray:
+        """
+        Apply one random move of the mutation operator to the mutated tours (in place)
+        their costs are updated by the O(1) deltas of the moves
+        :param population: tours (NP, n)
+        :param costs: lengths of the tours (NP,)
+        :return: mask (NP,) of mutated tours
+        """
+        mutated = np.random.rand(len(population)) < self.mutation_rate
+        n = self.no_of_cities
+        if n < 4:
+            # every tour of at most three cities is the same cycle, no move changes it
+            return np.zeros(len(population), dtype=bool)
+        rows = np.flatnonzero(mutated)
+        tours = population[rows]
+
+        if self.mutation in ("swap", "two-opt"):
+            i, j = self.distinct_positions(len(rows), n)
+            if self.mutation == "swap":
+                costs[rows] += swap_delta(tours, i, j, self.distances)
+                apply_swap(tours, i, j)
+            else:
+                costs[rows] += two_opt_delta(tours, i, j, self.distances)
+                apply_two_opt(tours, i, j)
+        else:
+            # segment leaves at least two cities outside, so there is an insertion point
+            length = 1 if self.mutation == "insertion" else np.minimum(np.random.randint(2, 4, size=len(rows)), n - 2)
+            i = np.random.randint(n - length + 1, size=len(rows))
+            # insertion point outside of the segment and the position in front of it
+            j = (i + length + np.random.randint(n - length - 1, size=len(rows))) % n
+            reverse = self.mutation == "or-opt" and np.random.rand(len(rows)) < 0.5
+            costs[rows] += or_opt_delta(tours, i, length, j, self.distances, reverse)
+            apply_or_opt(tours, i, length, j, reverse)
+
+        population[rows] = tours
+        return mutated
 
     def print_progress(self):
-        progress = len(self.result.generations) / self.generations
+        progress = self.result.count / self.generations
         bar_length = 100
         filled_length = int(bar_length * progress)
         bar = '#' * filled_length + '.' * (bar_length - filled_length)
@@ -67,22 +134,25 @@ class GeneticAlgorithm:
         sys.stdout.flush()
 
     def run(self) -> Genetic:
-        last_gen: Generation = self.result.add(self.generate_generation())
+        population = self.generate_population()
+        fitness = tour_costs(population, self.distances)
+        if self.local_search is not None:
+            fitness = self.local_search.improve_all(population, fitness)
+        self.result.add(self.record(population, fitness))
 
         for _ in range(self.generations):
-            new_gen = Generation()
-            for j in range(self.population_size):
-                # parent1 = copy(last_gen.best_ind)
-                parent1 = copy(last_gen.individuals[j])
-                parent2 = np.random.choice(last_gen.individuals, replace=False)
-                child = self.crossover(parent1, parent2)
-                self.mutate(child)
-
-                new_gen.add(parent1)
-                if child < parent1:
-                    new_gen.individuals[j] = child
-
-            last_gen = self.result.add(new_gen)
+            partners = np.random.randint(self.population_size, size=self.population_size)
+            children = self.crossover(population, population[partners])
+            costs = tour_costs(children, self.distances)
+            self.mutate(children, costs)
+            if self.local_search is not None:
+                costs = self.local_search.improve_all(children, costs)
+
+            better = costs < fitness
+            population[better] = children[better]
+            fitness[better] = costs[better]
+
+            self.result.add(self.record(population, fitness))
             self.print_progress()
 
         best_individual = self.result.best_gen.get_best()
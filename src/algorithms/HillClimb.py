@@ -1,43 +1,96 @@
+import math
+
 from src.Functions import Function
 from src.render.Render3D import *
+from src.utils.Evaluator import evaluation_budget, BudgetExhausted
 from src.utils.Result import *
 
 
 class HillClimb:
 
-    def __init__(self, functions: Function, population: int = 75, radius: float = 5):
+    def __init__(self, functions: Function, population: int = 75, radius: float = 5, climbers: int = 1,
+                 adaptive: bool = False, restarts: bool = False, min_radius: float = 1e-3,
+                 generations: int | None = None):
         """
 
         :param functions:
-        :param population: how many points to generate per iteration
+        :param population: how many points to generate per iteration (for every climber)
         :param radius: radius of the searchspace in %
+        :param climbers: number of independent climbers running at once
+        :param adaptive: adapt radius of every climber by the 1/5th success rule
+        :param restarts: restart converged climbers from random points until the budget (or generations) is used up
+        :param min_radius: adaptive climber with radius under this fraction of the searchspace is converged
+        :param generations: maximum number of generations, None for no limit
         """
         self.functions: Function = functions
         self.population: int = population  # Number of particles
         self.radius: float = radius
+        self.climbers: int = climbers
+        self.adaptive: bool = adaptive
+        self.restarts: bool = restarts
+        self.min_radius: float = min_radius
+        self.generations: int | None = generations
         self.result: dict[callable, Result] = {}
 
     def run_function(self, function: callable) -> Result:
+        if self.restarts and self.generations is None and evaluation_budget.get_max_calls() is None:
+            raise ValueError("restarts need an evaluation budget or a number of generations to stop")
+
+        evaluate = evaluation_budget.evaluator(function)
         dimension = function.dimension
-        better = True
-        radius_in_percent_for_scale = (function.range[1] - function.range[0]) * self.radius / 100
-        location: ndarray = np.random.uniform(low=function.range[0], high=function.range[1],
-                                              size=dimension)
+        width = function.range[1] - function.range[0]
+        initial_radius = width * self.radius / 100
+        generations = self.generations if self.generations is not None else math.inf
+        radii = np.full(self.climbers, initial_radius)
+        locations: ndarray = np.random.uniform(low=function.range[0], high=function.range[1],
+                                               size=(self.climbers, dimension))
+        # climbers which did not converge yet (without restarts converged climbers stop)
+        active = np.ones(self.climbers, dtype=bool)
         result = Result()
-        while better:
-            iteration = Iteration()
-            for j in range(self.population):
-                xx = np.random.normal(loc=location, scale=radius_in_percent_for_scale)
-                z = function(xx)
-                iteration.add_position(Position(z, xx))
-
-            if iteration.best.value < result.best.value:
-                result.best = iteration.best
-            else:
-                better = False
-
-            location = iteration.best.position
-            result.add_iteration(iteration)
+        iteration = Iteration()
+        try:
+            values = evaluate(locations)
+            # starting points belong to the first iteration
+            iteration.add_population(values, locations)
+            g = 0
+            while g < generations and np.any(active):
+                climbing = np.flatnonzero(active)
+
+                # population neighbours of every active climber as one (M, population, D) tensor
+                xx = np.random.normal(loc=locations[climbing, np.newaxis, :], scale=radii[climbing, np.newaxis, np.newaxis],
+                                      size=(len(climbing), self.population, dimension))
+                z = evaluate(xx.reshape(-1, dimension)).reshape(len(climbing), self.population)
+                iteration.add_population(z.ravel(), xx.reshape(-1, dimension))
+
+                previous = values[climbing].copy()
+                best = np.argmin(z, axis=1)
+                best_values = z[np.arange(len(climbing)), best]
+                better = best_values < values[climbing]
+                locations[climbing[better]] = xx[np.arange(len(climbing)), best][better]
+                values[climbing[better]] = best_values[better]
+
+                if self.adaptive:
+                    # 1/5th success rule, grow radius if more than fifth of neighbours is better, otherwise shrink it
+                    success = np.mean(z < previous[:, np.newaxis], axis=1)
+                    radii[climbing] *= np.where(success > 0.2, 1 / 0.817, np.where(success < 0.2, 0.817, 1.0))
+                    converged = climbing[radii[climbing] < self.min_radius * width]
+                else:
+                    converged = climbing[~better]
+
+                if self.restarts and len(converged):
+                    locations[converged] = np.random.uniform(low=function.range[0], high=function.range[1],
+                                                             size=(len(converged), dimension))
+                    radii[converged] = initial_radius
+                    values[converged] = evaluate(locations[converged])
+                    iteration.add_population(values[converged], locations[converged])
+                else:
+                    active[converged] = False
+
+                g += 1
+                result.add_iteration(iteration)
+                iteration = Iteration()
+        except BudgetExhausted as exhausted:
+            result.add_iteration(iteration.add_position(exhausted.best))
 
         self.result[function] = result
         return self.result[function]
@@ -1,74 +1,107 @@
-from copy import deepcopy
+import math
 
 from src.Functions import Function
 from src.render.Render3D import *
 from src.utils.Result import *
-from src.utils.Utils import functions_call_counter
-
-
-def evaluate_population(population: list[ndarray], function: callable) -> Position:
-    best_value = np.inf
-    best_position = None
-    for pos in population:
-        value = function(pos)
-        if value < best_value:
-            best_value = value
-            best_position = pos
-    return Position(best_value, best_position)
+from src.utils.Evaluator import evaluation_budget, BudgetExhausted
+
+TOPOLOGIES = ["global", "ring", "von-neumann"]
+
+
+def neighborhood(NP: int, topology: str) -> ndarray | None:
+    """
+    Indices of the neighbors of every particle (including the particle itself)
+    :param NP: number of particles
+    :param topology: "global", "ring" (i - 1, i, i + 1) or "von-neumann" (up, down, left and right on a torus grid)
+    :return: (NP, k) indices, None for global topology where everybody follows the global best
+    """
+    i = np.arange(NP)
+    if topology == "ring":
+        return np.stack(((i - 1) % NP, i, (i + 1) % NP), axis=1)
+    if topology == "von-neumann":
+        # rows x cols == NP as square as possible, so the grid is a real torus (a ring of rows=1 for prime NP)
+        rows = max(d for d in range(1, math.isqrt(NP) + 1) if NP % d == 0)
+        cols = NP // rows
+        row, col = np.divmod(i, cols)
+        return np.stack((i, (row - 1) % rows * cols + col, (row + 1) % rows * cols + col,
+                         row * cols + (col - 1) % cols, row * cols + (col + 1) % cols), axis=1)
+    return None
 
 
 class ParticleSwarmOptimization:
     def __init__(self, functions: Function, NP: int = 20, w: float = 0.5, c1: float = 1.5, c2: float = 1.5,
                  g_maxim: int = 50,
-                 treshold: float = 1e-4):
+                 treshold: float = 1e-4, topology: str = "global"):
+        """
+        :param functions:
+        :param NP: number of particles
+        :param w: inertia weight
+        :param c1: cognitive (personal best) coefficient
+        :param c2: social (neighborhood best) coefficient
+        :param g_maxim: maximum number of generations
+        :param treshold:
+        :param topology: "global", "ring" or "von-neumann" neighborhood of the social term
+        """
+        if topology not in TOPOLOGIES:
+            raise ValueError(f"unknown topology {topology}, use one of {TOPOLOGIES}")
         self.treshold = treshold
         self.NP = NP
         self.w = w
         self.c1 = c1
         self.c2 = c2
         self.g_maxim = g_maxim
+        self.topology: str = topology
         self.functions: Function = functions
         self.result: dict[callable, Result] = {}
 
-    def generate_population(self, fn: callable, dimension: int):
-        return [np.random.uniform(fn.range[0], fn.range[1], dimension) for _ in range(self.NP)]
+    def generate_population(self, fn: callable, dimension: int) -> ndarray:
+        return np.random.uniform(fn.range[0], fn.range[1], (self.NP, dimension))
 
     def run_function(self, function: callable) -> Result:
+        evaluate = evaluation_budget.evaluator(function)
         dimension = function.dimension
-        pop = self.generate_population(function, dimension)
-        velocities = [np.random.uniform(-1, 1, dimension) for _ in range(self.NP)]
-        personal_best_positions = deepcopy(pop)
-        personal_best_values = [function(pos) for pos in pop]
-        global_best_position = personal_best_positions[np.argmin(personal_best_values)]
+        neighbors = neighborhood(self.NP, self.topology)
+        pop = evaluate.empty((self.NP, dimension))
+        pop[:] = self.generate_population(function, dimension)
+        velocities = np.random.uniform(-1, 1, (self.NP, dimension))
+        personal_best_positions = pop.copy()
         g = 0
         result = Result()
+        iteration = Iteration()
 
-        while g < self.g_maxim and functions_call_counter.get_counts(function) < functions_call_counter.get_max_calls():
-            iteration = Iteration()
+        try:
+            personal_best_values = evaluate(pop)
 
-            for i, x in enumerate(pop):
-                r1, r2 = np.random.rand(dimension), np.random.rand(dimension)
-                velocities[i] = (self.w * velocities[i] +
-                                 self.c1 * r1 * (personal_best_positions[i] - x) +
-                                 self.c2 * r2 * (global_best_position - x))
-                pop[i] = np.clip(x + velocities[i], function.range[0], function.range[1])
-                f_x = function(pop[i])
+            while g < self.g_maxim:
+                iteration = Iteration()
 
-                if f_x < personal_best_values[i]:
-                    personal_best_positions[i] = pop[i]
-                    personal_best_values[i] = f_x
+                # the best personal best in the neighborhood, only from cached values
+                if neighbors is None:
+                    social_best = personal_best_positions[np.argmin(personal_best_values)]
+                else:
+                    best_neighbor = np.argmin(personal_best_values[neighbors], axis=1)
+                    social_best = personal_best_positions[neighbors[np.arange(self.NP), best_neighbor]]
 
-                if f_x < function(global_best_position):
-                    global_best_position = pop[i]
+                r1, r2 = np.random.rand(self.NP, dimension), np.random.rand(self.NP, dimension)
+                velocities = (self.w * velocities +
+                              self.c1 * r1 * (personal_best_positions - pop) +
+                              self.c2 * r2 * (social_best - pop))
+                pop[:] = np.clip(pop + velocities, function.range[0], function.range[1])
+                f_x = evaluate(pop)
 
-                iteration.add_position(Position(f_x, pop[i]))
+                improved = f_x < personal_best_values
+                personal_best_positions[improved] = pop[improved]
+                personal_best_values[improved] = f_x[improved]
 
-            best_position = evaluate_population(pop, function)
-            iteration.add_position(best_position)
+                iteration.add_population(f_x, pop)
+                best = np.argmin(personal_best_values)
+                iteration.add_position(Position(personal_best_values[best], personal_best_positions[best].copy()))
 
-            g += 1
+                g += 1
 
-            result.add_iteration(iteration)
+                result.add_iteration(iteration)
+        except BudgetExhausted as exhausted:
+            result.add_iteration(iteration.add_position(exhausted.best))
 
         self.result[function] = result
         return self.result[function]
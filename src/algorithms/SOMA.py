@@ -1,23 +1,15 @@
 from src.Functions import Function
 from src.render.Render3D import *
 from src.utils.Result import *
-from src.utils.Utils import functions_call_counter
+from src.utils.Evaluator import evaluation_budget, BudgetExhausted
 
-
-def evaluate_population(population: list[ndarray], function: callable) -> Position:
-    best_value = np.inf
-    best_position = None
-    for pos in population:
-        value = function(pos)
-        if value < best_value:
-            best_value = value
-            best_position = pos
-    return Position(best_value, best_position)
+STRATEGIES = ["AllToOne", "AllToAll", "AllToAllAdaptive", "T3A"]
 
 
 class SelfOrganizingMigrationAlgorithm:
 
-    def __init__(self, functions: Function, NP: int = 20, PRT: float = 0.4, path_length: float = 2.0, step: float = 0.11, M_max: int = 100, treshold: float = 1e-5):
+    def __init__(self, functions: Function, NP: int = 20, PRT: float = 0.4, path_length: float = 2.0, step: float = 0.11, M_max: int = 100, treshold: float = 1e-5,
+                 strategy: str = "AllToOne", migration_batch: bool = True, m: int = 10, n: int = 5, k: int = 15):
         """
         :param functions:
         :param NP: number of individuals in the population
@@ -26,7 +18,14 @@ class SelfOrganizingMigrationAlgorithm:
         :param step: the step size for each movement
         :param M_max: maximum number of migrations
         :param treshold: the treshold for the algorithm to stop
+        :param strategy: "AllToOne", "AllToAll", "AllToAllAdaptive" or "T3A"
+        :param migration_batch: evaluate paths of all individuals of a migration in one batch (not for AllToAllAdaptive)
+        :param m: T3A - number of randomly chosen candidates for migrants
+        :param n: T3A - number of migrants (the best of the m candidates)
+        :param k: T3A - number of randomly chosen candidates for leader (the best of them)
         """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"unknown strategy {strategy}, use one of {STRATEGIES}")
         self.functions: Function = functions
         self.pop_size: int = NP
         self.PRT: float = PRT
@@ -34,43 +33,122 @@ class SelfOrganizingMigrationAlgorithm:
         self.step: float = step
         self.M_max: int = M_max
         self.treshold: float = treshold
+        self.strategy: str = strategy
+        self.migration_batch: bool = migration_batch
+        self.m: int = min(m, NP)
+        self.n: int = min(n, self.m)
+        self.k: int = min(k, NP)
         self.result: dict[callable, Result] = {}
 
+    def paths(self, start: ndarray, targets: ndarray, steps: ndarray, PRT: float, function: callable) -> ndarray:
+        """
+        All positions on the paths of movers toward their targets, with new PRT vector for every position
+        :param start: (n, D) positions of the movers
+        :param targets: (n, j, D) j targets of every mover
+        :param steps: (s,) values of t on the path
+        :param PRT: perturbation rate
+        :return: (n, j * s, D) clipped positions
+        """
+        n, j, dimension = targets.shape
+        PRT_vectors = np.random.rand(n, j, len(steps), dimension) < PRT
+        direction = (targets - start[:, np.newaxis, :])[:, :, np.newaxis, :]
+        positions = start[:, np.newaxis, np.newaxis, :] + steps[:, np.newaxis] * direction * PRT_vectors
+        return np.clip(positions, function.range[0], function.range[1]).reshape(n, j * len(steps), dimension)
+
+    def migrate(self, evaluate: callable, population: ndarray, fitness: ndarray, movers: ndarray, targets: ndarray,
+                steps: ndarray, PRT: float, iteration: Iteration):
+        """
+        Journeys of the movers toward their targets, all positions are evaluated in one batch,
+        every mover ends on the best position of all its paths if it is better than its current one
+        :param movers: (n,) distinct indices of the moving individuals
+        :param targets: (n, j, D) j targets of every mover, every journey starts from the current position
+        """
+        if len(movers) == 0 or targets.shape[1] == 0:
+            # nobody to move or nowhere to go, e.g. T3A when the only candidate is the leader itself
+            return
+        paths = self.paths(population[movers], targets, steps, PRT, evaluate)
+        n, length, dimension = paths.shape
+        values = evaluate(paths.reshape(-1, dimension)).reshape(n, length)
+        iteration.add_population(values.ravel(), paths.reshape(-1, dimension))
+
+        best = np.argmin(values, axis=1)
+        best_values = values[np.arange(n), best]
+        improved = best_values < fitness[movers]
+        population[movers[improved]] = paths[np.arange(n), best][improved]
+        fitness[movers[improved]] = best_values[improved]
+
+    def migration(self, evaluate: callable, population: ndarray, fitness: ndarray, leader_index: int, progress: float,
+                  iteration: Iteration):
+        steps = np.arange(self.step, self.path_length, self.step)
+        everyone = np.arange(self.pop_size)
+
+        if self.strategy == "AllToOne":
+            movers = everyone[everyone != leader_index]
+            groups = [movers] if self.migration_batch else [movers[i:i + 1] for i in range(len(movers))]
+            leader = population[leader_index].copy()
+            for group in groups:
+                targets = np.broadcast_to(leader, (len(group), 1, len(leader)))
+                self.migrate(evaluate, population, fitness, group, targets, steps, self.PRT, iteration)
+
+        elif self.strategy == "AllToAll":
+            # every individual travels toward all the others from its position at the start of the migration
+            start = population.copy()
+            others = np.array([everyone[everyone != i] for i in everyone])
+            groups = [everyone] if self.migration_batch else [everyone[i:i + 1] for i in everyone]
+            for group in groups:
+                self.migrate(evaluate, population, fitness, group, start[others[group]], steps, self.PRT, iteration)
+
+        elif self.strategy == "AllToAllAdaptive":
+            # every individual moves immediately after each journey, so the journeys are sequential
+            for i in everyone:
+                for j in everyone[everyone != i]:
+                    self.migrate(evaluate, population, fitness, np.array([i]), population[j][np.newaxis, np.newaxis],
+                                 steps, self.PRT, iteration)
+
+        else:
+            # T3A: n best of m random individuals migrate toward the best of k random individuals,
+            # PRT grows and step shrinks with the progress of the run
+            candidates = np.random.choice(self.pop_size, self.m, replace=False)
+            movers = candidates[np.argsort(fitness[candidates])[:self.n]]
+            leaders = np.random.choice(self.pop_size, self.k, replace=False)
+            leader = population[leaders[np.argmin(fitness[leaders])]].copy()
+            movers = movers[np.any(population[movers] != leader, axis=1)]
+            PRT = 0.05 + 0.90 * progress
+            step = 0.02 + 0.005 * np.cos(0.5 * np.pi * progress)
+            steps = np.arange(step, self.path_length, step)
+            groups = [movers] if self.migration_batch else [movers[i:i + 1] for i in range(len(movers))]
+            for group in groups:
+                targets = np.broadcast_to(leader, (len(group), 1, len(leader)))
+                self.migrate(evaluate, population, fitness, group, targets, steps, PRT, iteration)
+
     def run_function(self, function: callable) -> Result:
+        evaluate = evaluation_budget.evaluator(function)
         dimension = function.dimension
-        # Initialize population
-        population = np.random.uniform(low=function.range[0], high=function.range[1], size=(self.pop_size, dimension))
-        fitness = np.apply_along_axis(function, 1, population)
-        leader_index = np.argmin(fitness)
-        leader = population[leader_index]
-
         result = Result()
-        for _ in range(self.M_max):
-            iteration = Iteration()
-            i = 0
-            while i < self.pop_size and functions_call_counter.get_counts(function) < functions_call_counter.get_max_calls():
-                if i == leader_index:
-                    i += 1
-                    continue
-                for t in np.arange(0, self.path_length, self.step):
-                    PRT_vector = np.random.rand(dimension) < self.PRT
-                    new_position = population[i] + t * (leader - population[i]) * PRT_vector
-                    new_position = np.clip(new_position, function.range[0], function.range[1])
-                    new_fitness = function(new_position)
-                    iteration.add_position(Position(new_fitness, new_position))
-                    if new_fitness < fitness[i]:
-                        population[i] = new_position
-                        fitness[i] = new_fitness
-                i += 1
+        iteration = Iteration()
 
+        try:
+            # Initialize population
+            population = evaluate.empty((self.pop_size, dimension))
+            population[:] = np.random.uniform(low=function.range[0], high=function.range[1], size=(self.pop_size, dimension))
+            fitness = evaluate(population)
             leader_index = np.argmin(fitness)
-            leader = population[leader_index]
-            iteration.add_position(Position(fitness[leader_index], leader))
-            result.add_iteration(iteration)
 
-            # if difference between population and leader is smaller than treshold, stop
-            if np.linalg.norm(np.mean(population, axis=0) - leader) < self.treshold:
-                break
+            for migration in range(self.M_max):
+                iteration = Iteration()
+                progress = max(evaluate.calls / evaluate.max_calls, migration / self.M_max)
+                self.migration(evaluate, population, fitness, leader_index, progress, iteration)
+
+                leader_index = np.argmin(fitness)
+                leader = population[leader_index]
+                iteration.add_position(Position(fitness[leader_index], leader.copy()))
+                result.add_iteration(iteration)
+
+                # if difference between population and leader is smaller than treshold, stop
+                if np.linalg.norm(np.mean(population, axis=0) - leader) < self.treshold:
+                    break
+        except BudgetExhausted as exhausted:
+            result.add_iteration(iteration.add_position(exhausted.best))
 
         self.result[function] = result
         return self.result[function]
@@ -92,124 +170,3 @@ class SelfOrganizingMigrationAlgorithm:
         render = Render3D()
         for function in self.functions.get_all():
             render.render3d(self.result[function], function)
-
-    ###################################################################################################################
-    # another versions of soma (sometimes reaaaaaly advanced (prof. Zelinka (https://ivanzelinka.eu/somaalgorithm/Codes.html) ))
-
-    # def __init__(self, functions: Function, NP: int = 30, prt: float = 0.4, NStep: int = 3, Migrations: int = 40,
-    #              MinDist: float = 1e-6):
-    #     self.NP = NP
-    #     self.prt = prt
-    #     self.NStep = NStep
-    #     self.Migrations = Migrations
-    #     self.MinDist = MinDist
-    #     self.functions: Function = functions
-    #     self.result: dict[callable, Result] = {}
-    #
-    # def generate_population(self, fn: callable, dimension: int):
-    #     return [np.random.uniform(fn.range[0], fn.range[1], dimension) for _ in range(self.NP)]
-    #
-    # def cost_function_sort(self, pop, function):
-    #     pop = np.array(pop)
-    #     costs = [function(ind) for ind in pop]
-    #     sorted_indices = np.argsort(costs)
-    #     return pop[sorted_indices]
-    #
-    # def create_prt_vector(self, prt, pop_size, num_of_x):
-    #     prt_vector = np.zeros((num_of_x, pop_size))
-    #     for j in range(pop_size):
-    #         for i in range(num_of_x):
-    #             if random.random() < prt:
-    #                 prt_vector[i][j] = 1
-    #     return prt_vector
-    #
-    # def movement(self, pop, prt, NStep, function):
-    #     pop_size = len(pop)
-    #     num_of_x = len(pop[0])
-    #     new_pop = deepcopy(pop)
-    #     PRT = self.create_prt_vector(prt, pop_size, num_of_x)
-    #
-    #     for i in range(pop_size):
-    #         vector_of_steps = np.zeros((num_of_x, 4 * NStep))
-    #         for s in range(4 * NStep):
-    #             vector_of_steps[:, s] = new_pop[i] + ((new_pop[0] - new_pop[i]) / (2 * NStep)) * PRT[:, i] * s
-    #         new_pop[i] = self.cost_function_sort(vector_of_steps.T, function)[0]
-    #
-    #     for i in range(pop_size, pop_size * 2):
-    #         vector_of_steps = np.zeros((num_of_x, 2 * NStep))
-    #         for s in range(2 * NStep):
-    #             vector_of_steps[:, s] = new_pop[i % pop_size] + ((new_pop[1] - new_pop[i % pop_size]) / NStep) * PRT[:,
-    #                                                                                                              i % pop_size] * s
-    #         new_pop[i % pop_size] = self.cost_function_sort(vector_of_steps.T, function)[0]
-    #
-    #     for i in range(pop_size * 2, pop_size * 3):
-    #         vector_of_steps = np.zeros((num_of_x, NStep))
-    #         for s in range(NStep):
-    #             vector_of_steps[:, s] = new_pop[i % pop_size] + (
-    #                     (new_pop[2] - new_pop[i % pop_size]) / (NStep / 2)) * PRT[:, i % pop_size] * s
-    #         new_pop[i % pop_size] = self.cost_function_sort(vector_of_steps.T, function)[0]
-    #
-    #     return new_pop
-    #
-    # def elaboration(self, pop, NStep, prt, function):
-    #     num_of_x = len(pop[0])
-    #     NStep *= 10
-    #     PRT = self.create_prt_vector(prt, 3, num_of_x)
-    #     vector_of_steps = np.zeros((num_of_x, NStep))
-    #     ans = np.zeros((num_of_x, 3))
-    #     for i in range(3):
-    #         for s in range(NStep):
-    #             vector_of_steps[:, s] = pop[i] + ((pop[0] - pop[i]) / (NStep / 2)) * PRT[:, i] * s
-    #         ans[:, i] = self.cost_function_sort(vector_of_steps.T, function)[0]
-    #     ans = self.cost_function_sort(ans.T, function)
-    #     return ans[0]
-    #
-    # def run_function(self, function: callable) -> Result:
-    #     dimension = len(function.range)
-    #     pop = self.generate_population(function, dimension)
-    #     pop = self.cost_function_sort(pop, function)
-    #     new_pop = np.concatenate((pop, pop, pop), axis=0)
-    #
-    #     MCount = 0
-    #     result = Result()
-    #
-    #     while MCount < self.Migrations and math.sqrt((1 / 2) * ((function(new_pop[1]) - function(new_pop[0])) ** 2 + (
-    #             function(new_pop[2]) - function(new_pop[0])) ** 2)) >= self.MinDist:
-    #         new_pop = self.movement(new_pop, self.prt, self.NStep, function)
-    #         new_pop = self.cost_function_sort(new_pop, function)
-    #         new_pop = np.concatenate(
-    #             (new_pop[:round(self.NP * (2 / 3))], self.generate_population(function, dimension)), axis=0)
-    #         new_pop = self.cost_function_sort(new_pop, function)
-    #         new_pop = np.concatenate((new_pop, new_pop, new_pop), axis=0)
-    #
-    #         MCount += 1
-    #
-    #         iteration = Iteration()
-    #         for pos in new_pop[:self.NP]:
-    #             iteration.add_position(Position(function(pos), pos))
-    #         result.add_iteration(iteration)
-    #
-    #     last_pop = new_pop[:3]
-    #     ans = self.elaboration(last_pop, self.NStep, self.prt, function)
-    #
-    #     self.result[function] = result
-    #     return self.result[function]
-    #
-    # def run_all(self) -> dict[callable, Result]:
-    #     for function in self.functions.get_all():
-    #         self.run_function(function)
-    #     return self.result
-    #
-    # def render(self, function: callable, is_2d: bool = False):
-    #     render = Render3D()
-    #
-    #     if function in self.result:
-    #         render.render3d(self.result[function], function)
-    #     else:
-    #         self.run_function(function)
-    #         render.render3d(self.result[function], function)
-    #
-    # def render_all(self):
-    #     render = Render3D()
-    #     for function in self.functions.get_all():
-    #         render.render3d(self.result[function], function)
@@ -1,56 +1,108 @@
+import math
+
 from src.Functions import Function
 from src.render.Render3D import *
+from src.utils.Evaluator import evaluation_budget, BudgetExhausted
 from src.utils.Result import *
 
+SCHEDULES = ["geometric", "budget"]
+
 
 class SimAnnealing:
 
     # simulated annealing algorithm class
-    def __init__(self, functions: Function, initial_temp: float = 100, min_temp: float = 0.5, alpha: float = 0.95):
+    def __init__(self, functions: Function, initial_temp: float = 100, min_temp: float = 0.5, alpha: float = 0.95,
+                 chains: int = 1, ladder: float = 2.0, swap_interval: int = 10, schedule: str = "geometric",
+                 steps: int | None = None):
         """
         :param functions: Function object containing all functions to optimize
         :param initial_temp: Initial temperature for the annealing process
         :param min_temp: Minimum temperature for the annealing process
         :param alpha: Cooling rate
+        :param chains: number of chains (parallel tempering), chain k runs at ladder^k times the temperature of the coldest one
+        :param ladder: ratio of temperatures of adjacent chains
+        :param swap_interval: number of steps between swaps of states of adjacent chains
+        :param schedule: "geometric" (T *= alpha until min_temp) or "budget" (from initial_temp to min_temp over the whole
+                         evaluation budget, or over steps)
+        :param steps: number of steps of the budget schedule, None to run until the budget is exhausted
         """
+        if schedule not in SCHEDULES:
+            raise ValueError(f"unknown schedule {schedule}, use one of {SCHEDULES}")
         self.functions: Function = functions
         self.initial_temp: float = initial_temp
         self.min_temp: float = min_temp
         self.alpha: float = alpha
+        self.chains: int = chains
+        self.ladder: float = ladder
+        self.swap_interval: int = swap_interval
+        self.schedule: str = schedule
+        self.steps: int | None = steps
         self.result: dict[callable, Result] = {}
 
+    def number_of_steps(self) -> float:
+        geometric = math.ceil(math.log(self.min_temp / self.initial_temp) / math.log(self.alpha))
+        if self.schedule == "geometric":
+            return geometric
+        if self.steps is not None:
+            return self.steps
+        # without budget the budget schedule would never end
+        return math.inf if evaluation_budget.get_max_calls() is not None else geometric
+
+    def temperature(self, step: int, steps: float, evaluate) -> float:
+        """
+        :return: temperature of the coldest chain
+        """
+        if self.schedule == "geometric":
+            return self.initial_temp * self.alpha ** step
+        progress = max(evaluate.calls / evaluate.max_calls, step / steps)
+        return self.initial_temp * (self.min_temp / self.initial_temp) ** progress
+
+    def swap(self, locations: ndarray, values: ndarray, T: ndarray, parity: int):
+        """
+        Swap states of adjacent chains (even or odd pairs) with probability min(1, e^((E_i - E_j)(1/T_i - 1/T_j)))
+        """
+        first = np.arange(parity, self.chains - 1, 2)
+        second = first + 1
+        exponent = (values[first] - values[second]) * (1 / T[first] - 1 / T[second])
+        swapped = np.random.uniform(size=len(first)) < np.exp(np.minimum(exponent, 0))
+        pairs = np.concatenate((first[swapped], second[swapped]))
+        exchanged = np.concatenate((second[swapped], first[swapped]))
+        locations[pairs] = locations[exchanged]
+        values[pairs] = values[exchanged]
+
     def run_function(self, function: callable) -> Result:
+        evaluate = evaluation_budget.evaluator(function)
         dimension = function.dimension
-        T = self.initial_temp
-        location: ndarray = np.random.uniform(low=function.range[0], high=function.range[1], size=dimension)
-        best_value = function(location)
+        ladder = self.ladder ** np.arange(self.chains)
+        steps = self.number_of_steps()
+        locations: ndarray = np.random.uniform(low=function.range[0], high=function.range[1], size=(self.chains, dimension))
         radius_in_percent_for_scale = (function.range[1] - function.range[0]) * 4 / 100
         result = Result()
 
         iteration = Iteration()
-        # while T > T_min:
-        while T > self.min_temp:
-
-            # x_1 = generate neighbour of x in normal distribution
-            new_location = np.random.normal(location, radius_in_percent_for_scale, size=dimension)
-            # Evaluate x_1
-            new_value = function(new_location)
-
-            # if f(x_1) < f(x):
-            if new_value < best_value:
-                # x = x_1
-                location = new_location
-                best_value = new_value
-
-            else:
-                # r = random number in uniform distribution
-                r = np.random.uniform()
-                # if r < e^(-(f(x_1)-f(x))/T ):
-                if r < np.exp((best_value - new_value) / T):
-                    location = new_location
-
-            iteration.add_position(Position(new_value, new_location))
-            T *= self.alpha
+        try:
+            values = evaluate(locations)
+            step = 0
+            while step < steps:
+                T = self.temperature(step, steps, evaluate) * ladder
+
+                # x_1 = generate neighbour of x in normal distribution, for all chains at once
+                new_locations = np.random.normal(locations, radius_in_percent_for_scale)
+                new_values = evaluate(new_locations)
+
+                # accept if f(x_1) < f(x) or r < e^(-(f(x_1)-f(x))/T )
+                r = np.random.uniform(size=self.chains)
+                accepted = (new_values < values) | (r < np.exp(np.minimum((values - new_values) / T, 0)))
+                locations[accepted] = new_locations[accepted]
+                values[accepted] = new_values[accepted]
+
+                iteration.add_population(new_values, new_locations)
+                step += 1
+
+                if self.chains > 1 and step % self.swap_interval == 0:
+                    self.swap(locations, values, T, (step // self.swap_interval) % 2)
+        except BudgetExhausted as exhausted:
+            iteration.add_position(exhausted.best)
 
         result.add_iteration(iteration)
         self.result[function] = result
@@ -1,18 +1,7 @@
 from src.Functions import Function
 from src.render.Render3D import *
 from src.utils.Result import *
-from src.utils.Utils import functions_call_counter
-
-
-def evaluate_population(population: list[ndarray], function: callable) -> Position:
-    best_value = np.inf
-    best_position = None
-    for pos in population:
-        value = function(pos)
-        if value < best_value:
-            best_value = value
-            best_position = pos
-    return Position(best_value, best_position)
+from src.utils.Evaluator import evaluation_budget, BudgetExhausted
 
 
 class TeachingLearningBasedOptimization:
@@ -22,47 +11,68 @@ class TeachingLearningBasedOptimization:
         self.functions: Function = functions
         self.result: dict[callable, Result] = {}
 
-    def generate_population(self, fn: callable, dimension: int):
-        return [np.random.uniform(fn.range[0], fn.range[1], dimension) for _ in range(self.NP)]
+    def generate_population(self, fn: callable, dimension: int) -> ndarray:
+        return np.random.uniform(fn.range[0], fn.range[1], (self.NP, dimension))
+
+    def partners(self) -> ndarray:
+        """
+        :return: (NP,) permutation without fixed points, partner of learner i is partners[i]
+        """
+        order = np.random.permutation(self.NP)
+        partners = np.empty(self.NP, dtype=int)
+        # random cycle through all learners, everybody learns from the next one in the cycle
+        partners[order] = np.roll(order, -1)
+        return partners
+
+    def select(self, pop: ndarray, fitness: ndarray, new_pop: ndarray, f_new: ndarray):
+        improved = f_new < fitness
+        pop[improved] = new_pop[improved]
+        fitness[improved] = f_new[improved]
 
     def run_function(self, function: callable) -> Result:
+        evaluate = evaluation_budget.evaluator(function)
         dimension = function.dimension
-        pop = self.generate_population(function, dimension)
+        pop = evaluate.empty((self.NP, dimension))
+        pop[:] = self.generate_population(function, dimension)
+        new_pop = evaluate.empty((self.NP, dimension))
         g = 0
         result = Result()
-
-        while g < self.g_maxim and functions_call_counter.get_counts(function) < functions_call_counter.get_max_calls():
-            iteration = Iteration()
-
-            # Teaching Phase
-            teacher = min(pop, key=function)
-            mean = np.mean(pop, axis=0)
-            for i in range(self.NP):
-                TF = np.random.randint(1, 3)  # Teaching Factor
-                new_position = pop[i] + np.random.rand(dimension) * (teacher - TF * mean)
-                new_position = np.clip(new_position, function.range[0], function.range[1])
-                if function(new_position) < function(pop[i]):
-                    pop[i] = new_position
-
-            # Learning Phase
-            for i in range(self.NP):
-                partner = pop[np.random.randint(self.NP)]
-                if function(partner) < function(pop[i]):
-                    new_position = pop[i] + np.random.rand(dimension) * (partner - pop[i])
-                else:
-                    new_position = pop[i] + np.random.rand(dimension) * (pop[i] - partner)
-                new_position = np.clip(new_position, function.range[0], function.range[1])
-                if function(new_position) < function(pop[i]):
-                    pop[i] = new_position
-
-                iteration.add_position(Position(function(pop[i]), pop[i]))
-
-            best_position = evaluate_population(pop, function)
-            iteration.add_position(best_position)
-
-            g += 1
-
-            result.add_iteration(iteration)
+        iteration = Iteration()
+
+        try:
+            fitness = evaluate(pop)
+
+            while g < self.g_maxim:
+                iteration = Iteration()
+
+                # Teaching Phase
+                teacher = pop[np.argmin(fitness)].copy()
+                mean = np.mean(pop, axis=0)
+                TF = np.random.randint(1, 3, (self.NP, 1))  # Teaching Factor
+                new_pop[:] = np.clip(pop + np.random.rand(self.NP, dimension) * (teacher - TF * mean),
+                                     function.range[0], function.range[1])
+                f_new = evaluate(new_pop)
+                iteration.add_population(f_new, new_pop)
+                self.select(pop, fitness, new_pop, f_new)
+
+                # Learning Phase
+                partners = self.partners()
+                better_partner = (fitness[partners] < fitness)[:, np.newaxis]
+                direction = np.where(better_partner, pop[partners] - pop, pop - pop[partners])
+                new_pop[:] = np.clip(pop + np.random.rand(self.NP, dimension) * direction,
+                                     function.range[0], function.range[1])
+                f_new = evaluate(new_pop)
+                iteration.add_population(f_new, new_pop)
+                self.select(pop, fitness, new_pop, f_new)
+
+                best = np.argmin(fitness)
+                iteration.add_position(Position(fitness[best], pop[best].copy()))
+
+                g += 1
+
+                result.add_iteration(iteration)
+        except BudgetExhausted as exhausted:
+            result.add_iteration(iteration.add_position(exhausted.best))
 
         self.result[function] = result
         return self.result[function]
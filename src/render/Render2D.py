@@ -40,14 +40,21 @@ class Render2D:
         # plt.show()
 
     def plot_generation(self, generation: list[Generation], nth: int = 5):
+        """
+        Plot best individuals of the recorded generations (all, or whatever the recording of the run kept)
+        :param generation: recorded generations
+        :param nth: number of saved plots
+        """
         self.ax.clear()
+        generations = list(generation)
+        step = max(1, (len(generations) - 1) // nth)
 
-        for (index, gen) in enumerate(generation):
-            self.index = index
+        for (index, gen) in enumerate(generations):
+            self.index = gen.number
             # print(f"Generation {index + 1}")
             self.plot_individual(gen.best_ind)
-            if index % int(((len(generation) - 1) / nth)) == 0:
-                plt.savefig(f'../results/generation_{index + 1}.png')  # Save the plot at each interval
+            if index % step == 0:
+                plt.savefig(f'../results/generation_{gen.number + 1}.png')  # Save the plot at each interval
             plt.pause(self.wait)
             self.ax.clear()
 
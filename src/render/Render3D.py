@@ -37,11 +37,7 @@ class Render3D:
         y = np.linspace(function.range[0], function.range[1], self.resolution)
 
         X, Y = np.meshgrid(x, y)
-        Z = np.zeros(X.shape)
-
-        for i in range(X.shape[0]):
-            for j in range(X.shape[1]):
-                Z[i, j] = function(np.array([X[i, j], Y[i, j]]))
+        Z = function(np.column_stack((X.ravel(), Y.ravel()))).reshape(X.shape)
 
         if self.as_surface:
             contour = self.ax.contourf(X, Y, Z, cmap='viridis', alpha=0.75)
@@ -58,7 +54,14 @@ class Render3D:
         best_pts = []
         color = pyrand.choice(self.colors)
 
-        if not self.only_best:
+        if not self.only_best and not self.per_point:
+            # whole iteration in one scatter, straight from the columns
+            positions, values = iteration.positions, iteration.values
+            if self.as_surface:
+                pts.append(self.ax.scatter(positions[:, 0], positions[:, 1], color=color, marker='x', s=10))
+            else:
+                pts.append(self.ax.scatter(positions[:, 0], positions[:, 1], values, color=color, marker='x', s=10))
+        elif not self.only_best:
             for point in iteration.history:
                 if self.as_surface:
                     pts.append(self.ax.scatter(point.position[0], point.position[1], color=color, marker='x', s=10))
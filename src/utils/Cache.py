@@ -0,0 +1,126 @@
+import dbm
+import hashlib
+import os
+from collections import OrderedDict
+
+import numpy as np
+from numpy import ndarray
+
+
+class EvaluationCache:
+    """
+    Memoizing cache of values of one function, keyed on the raw bytes of the evaluated point
+
+    - in memory it keeps at most max_size values and evicts the least recently used one
+    - with path it also persists every value into a dbm file, so repeated points are never recomputed across runs
+    - counts hits and misses
+    """
+
+    def __init__(self, max_size: int = 100_000, path: str | None = None):
+        """
+        :param max_size: maximum number of values kept in memory
+        :param path: file of the persistent store, None for memory only
+        """
+        self.max_size: int = max_size
+        self.path: str | None = path
+        self.entries: OrderedDict[bytes, float] = OrderedDict()
+        self.store = dbm.open(path, "c") if path is not None else None
+        self.hits: int = 0
+        self.misses: int = 0
+
+    @staticmethod
+    def key(xx: ndarray) -> bytes:
+        return np.ascontiguousarray(xx, dtype=np.float64).tobytes()
+
+    def get(self, key: bytes) -> float | None:
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+        if self.store is not None:
+            stored = self.store.get(key)
+            if stored is not None:
+                value = float(np.frombuffer(stored, dtype=np.float64)[0])
+                self._remember(key, value)
+                self.hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    def put(self, key: bytes, value: float):
+        self._remember(key, value)
+        if self.store is not None:
+            self.store[key] = np.float64(value).tobytes()
+
+    def _remember(self, key: bytes, value: float):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def stats(self) -> dict[str, float]:
+        calls = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self.entries),
+            "hit_rate": self.hits / calls if calls else 0.0,
+        }
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class CacheRegistry:
+    """
+    One EvaluationCache per objective, shared by all runs which evaluate the objective
+
+    - objectives are told apart by their cache_key (name together with dimension, range, transform, ...),
+      objectives without cache_key share a cache only with the very same object
+    - persistent stores are named by the function name and a hash of the key
+    """
+
+    def __init__(self, max_size: int = 100_000, directory: str | None = None):
+        """
+        :param max_size: maximum number of values kept in memory per function
+        :param directory: directory of the persistent stores (one file per function), None for memory only
+        """
+        self.max_size: int = max_size
+        self.directory: str | None = directory
+        self.caches: dict[str, EvaluationCache] = {}
+        # objectives keyed by identity, kept alive so their ids are not reused
+        self.objectives: dict[str, callable] = {}
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def key(self, function: callable) -> str:
+        key = getattr(function, "cache_key", None)
+        if key is None:
+            key = f"{function.__name__}@{id(function):x}"
+            self.objectives[key] = function
+        return key
+
+    def get(self, function: callable) -> EvaluationCache:
+        key = self.key(function)
+        if key not in self.caches:
+            path = None
+            if self.directory is not None:
+                digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+                path = os.path.join(self.directory, f"{function.__name__}_{digest}")
+            self.caches[key] = EvaluationCache(self.max_size, path)
+        return self.caches[key]
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        return {name: cache.stats() for name, cache in self.caches.items()}
+
+    def close(self):
+        for cache in self.caches.values():
+            cache.close()
@@ -0,0 +1,190 @@
+import numpy as np
+from numpy import ndarray
+
+from src.utils.Cache import EvaluationCache, CacheRegistry
+from src.utils.Result import Position
+from src.utils.Utils import singleton
+
+
+class BudgetExhausted(Exception):
+    """
+    Raised by Evaluator when a run asks for an evaluation after its budget was used up
+    carries the best position evaluated during the run
+    """
+
+    def __init__(self, best: Position):
+        super().__init__(f"evaluation budget exhausted, best value: {best.value}")
+        self.best: Position = best
+
+
+class Evaluator:
+    """
+    Budgeted evaluator of one function, scoped to one run of an algorithm
+
+    - every evaluated point is charged, a population (NP, D) costs NP evaluations
+    - a population which does not fit into the remaining budget is evaluated only up to the budget,
+      values of the rest are np.inf (never accepted by the algorithms)
+    - any call after the budget was used up raises BudgetExhausted, except an empty population (0, D)
+    - keeps the best evaluated position, so the run can still return it after exhaustion
+    - with cache, points already evaluated are looked up instead and their hits are not charged
+    - with backend (e.g. ProcessPoolBackend), populations are evaluated by the backend, single points directly
+
+    Exposes range, dimension and __name__ of the wrapped function, so it can be used in its place.
+    """
+
+    def __init__(self, function: callable, max_calls: int | None = None, cache: EvaluationCache | None = None,
+                 backend=None):
+        """
+        :param function: function to evaluate (one of Function.get_all())
+        :param max_calls: evaluation budget of the run, None for unlimited
+        :param cache: optional cache of already evaluated points of the function
+        :param backend: optional backend with evaluate(function, population) -> values
+        """
+        self.function: callable = function
+        self.range: tuple[float, float] = function.range
+        self.dimension: int = function.dimension
+        self.__name__: str = function.__name__
+        self.max_calls: int = np.iinfo(np.int64).max if max_calls is None else max_calls
+        self.calls: int = 0
+        self.cache: EvaluationCache | None = cache
+        self.backend = backend
+        self.best: Position = Position(np.inf, np.array([0]))
+
+    def __call__(self, xx: ndarray) -> float | ndarray:
+        xx = np.asarray(xx)
+        if xx.ndim == 2 and len(xx) == 0:
+            # empty population costs nothing, not even after the budget was used up
+            return np.empty(0)
+        if self.cache is not None:
+            return self._lookup(xx)
+        return self._evaluate(xx)
+
+    def _evaluate(self, xx: ndarray) -> float | ndarray:
+        remaining = self.max_calls - self.calls
+        if remaining <= 0:
+            raise BudgetExhausted(self.best)
+
+        if xx.ndim == 1:
+            self.calls += 1
+            value = self.function(xx)
+            self._track(xx, value)
+            return value
+
+        if len(xx) > remaining:
+            values = np.full(len(xx), np.inf)
+            values[:remaining] = self._population(xx[:remaining])
+            self.calls += remaining
+        else:
+            values = self._population(xx)
+            self.calls += len(xx)
+
+        best = np.argmin(values)
+        self._track(xx[best], values[best])
+        return values
+
+    def _population(self, xx: ndarray) -> ndarray:
+        if self.backend is None:
+            return self.function(xx)
+        return self.backend.evaluate(self.function, xx)
+
+    def empty(self, shape: tuple[int, int]) -> ndarray:
+        """
+        Population array for this run, in shared memory when the backend supports it (SharedMemoryBackend)
+        so the backend evaluates its rows in place
+        :param shape: (NP, D)
+        """
+        if self.backend is not None and hasattr(self.backend, "buffer"):
+            return self.backend.buffer(shape)
+        return np.empty(shape)
+
+    def _lookup(self, xx: ndarray) -> float | ndarray:
+        if xx.ndim == 1:
+            key = self.cache.key(xx)
+            value = self.cache.get(key)
+            if value is None:
+                value = self._evaluate(xx)
+                self.cache.put(key, value)
+            else:
+                self._track(xx, value)
+            return value
+
+        keys = [self.cache.key(x) for x in xx]
+        values = np.empty(len(xx))
+        missing = []
+        for i, key in enumerate(keys):
+            value = self.cache.get(key)
+            if value is None:
+                missing.append(i)
+            else:
+                values[i] = value
+
+        if missing:
+            calls = self.calls
+            values[missing] = self._evaluate(xx[missing])
+            # only the points which fitted into the budget were really evaluated
+            for i in missing[:self.calls - calls]:
+                self.cache.put(keys[i], values[i])
+
+        best = np.argmin(values)
+        self._track(xx[best], values[best])
+        return values
+
+    def _track(self, xx: ndarray, value: float):
+        if value < self.best.value:
+            self.best = Position(value, xx.copy())
+
+    @property
+    def remaining(self) -> int:
+        return self.max_calls - self.calls
+
+    @property
+    def exhausted(self) -> bool:
+        return self.calls >= self.max_calls
+
+
+@singleton
+class EvaluationBudget:
+    """
+    Evaluation budget shared by all runs, every run gets its own Evaluator with a fresh counter
+
+    Optionally holds the evaluation caches, one per function, which outlive the runs.
+    Cache hits are free, so keep the cache disabled when comparing algorithms on a fixed budget.
+    Optionally holds the backend which evaluates the populations (e.g. ProcessPoolBackend).
+    """
+
+    def __init__(self, max_calls: int | None = None):
+        self.max_calls: int | None = max_calls
+        self.caches: CacheRegistry | None = None
+        self.backend = None
+
+    def set_max_calls(self, max_calls: int | None):
+        self.max_calls = max_calls
+
+    def get_max_calls(self) -> int | None:
+        return self.max_calls
+
+    def enable_cache(self, max_size: int = 100_000, directory: str | None = None):
+        """
+        :param max_size: maximum number of values kept in memory per function
+        :param directory: directory for persistent caches on disk, None for memory only
+        """
+        self.disable_cache()
+        self.caches = CacheRegistry(max_size, directory)
+
+    def disable_cache(self):
+        if self.caches is not None:
+            self.caches.close()
+        self.caches = None
+
+    def set_backend(self, backend):
+        """
+        :param backend: object with evaluate(function, population) -> values, None to evaluate in this process
+        """
+        self.backend = backend
+
+    def evaluator(self, function: callable) -> Evaluator:
+        cache = self.caches.get(function) if self.caches is not None else None
+        return Evaluator(function, self.max_calls, cache, self.backend)
+
+
+evaluation_budget = EvaluationBudget()
@@ -1,8 +1,14 @@
+from collections import deque
+
 import numpy as np
 from numpy import ndarray
 
+RECORDINGS = ["full", "best", "every", "ring"]
+
 
 class Point:
+    __slots__ = ("x", "y", "name")
+
     def __init__(self, x: float, y: float, name: str):
         self.x: float = x
         self.y: float = y
@@ -15,20 +21,46 @@ class Point:
         return self.name
 
 
+def tour_costs(tours: ndarray, distances: ndarray) -> ndarray:
+    """
+    Lengths of closed tours, gathered from the distance matrix
+    :param tours: tour (n,) or population of tours (NP, n) of city indices
+    :param distances: distance matrix (n, n)
+    :return: length of the tour or lengths (NP,)
+    """
+    return np.sum(distances[tours, np.roll(tours, -1, axis=-1)], axis=-1)
+
+
 class Individual:
-    def __init__(self):
-        self.points: list[Point] = []
-        self.fitness: float = np.inf
-        self.feromones: ndarray = np.zeros((len(self.points), len(self.points)))
+    __slots__ = ("cities", "tour", "fitness")
+
+    def __init__(self, tour: ndarray | None = None, cities: list[Point] | None = None, fitness: float = np.inf):
+        """
+        :param tour: order of the cities (int32 indices into cities)
+        :param cities: all cities of the instance, shared by all individuals
+        :param fitness: length of the tour, if already known
+        """
+        self.cities: list[Point] = cities if cities is not None else []
+        self.tour: ndarray = tour if tour is not None else np.empty(0, dtype=np.int32)
+        self.fitness: float = fitness
+
+    @property
+    def points(self) -> list[Point]:
+        return [self.cities[i] for i in self.tour]
 
     def add(self, point: Point) -> Point:
-        self.points.append(point)
+        self.tour = np.append(self.tour, np.int32(len(self.cities)))
+        # own copy, cities are shared with the rest of the population
+        self.cities = [*self.cities, point]
         return point
 
-    def calculate_cost(self):
-        # for i in range(len(self.points) - 1):
-        #     self.fitness += np.sqrt( (self.points[i].x - self.points[i + 1].x) ** 2 + (self.points[i].y - self.points[i + 1].y) ** 2)
-        # self.fitness += np.sqrt( (self.points[0].x - self.points[-1].x) ** 2 + (self.points[0].y - self.points[-1].y) ** 2)
+    def calculate_cost(self, distances: ndarray | None = None):
+        """
+        :param distances: distance matrix of the cities, None to compute the distances from the coordinates
+        """
+        if distances is not None:
+            self.fitness = tour_costs(self.tour, distances)
+            return
 
         coords = np.array([(point.x, point.y) for point in self.points])
         distances = np.sqrt(np.sum(np.diff(coords, axis=0, append=coords[:1]) ** 2, axis=1))
@@ -51,18 +83,43 @@ class Individual:
 
 
 class Generation:
-    def __init__(self):
+    __slots__ = ("individuals", "best_ind", "best_only", "number")
+
+    def __init__(self, best_only: bool = False):
+        """
+        :param best_only: keep only the best individual instead of all of them
+        """
         self.individuals: list[Individual] = []
         self.best_ind: Individual | None = None
+        self.best_only: bool = best_only
+        self.number: int = 0  # number of the generation in the run, set by Genetic
 
     def add(self, individual: Individual) -> Individual:
-        self.individuals.append(individual)
         if self.best_ind is None:
             self.best_ind = individual
         if individual.fitness < self.best_ind.fitness:
             self.best_ind = individual
+        if self.best_only:
+            self.individuals = [self.best_ind]
+        else:
+            self.individuals.append(individual)
         return individual
 
+    def add_tours(self, tours: ndarray, fitness: ndarray, cities: list[Point]) -> 'Generation':
+        """
+        Add population of tours (NP, n), with best_only only the best tour is copied
+        :param fitness: lengths of the tours (NP,)
+        :param cities: cities of the instance
+        """
+        if self.best_only:
+            best = np.argmin(fitness)
+            self.add(Individual(tours[best].copy(), cities, fitness[best]))
+            return self
+        # one copy of the population, individuals keep views of its rows
+        for tour, cost in zip(tours.copy(), fitness):
+            self.add(Individual(tour, cities, cost))
+        return self
+
     def get_best(self) -> Individual:
         return self.best_ind
 
@@ -83,16 +140,48 @@ class Generation:
 
 
 class Genetic:
-    def __init__(self):
-        self.generations: list[Generation] = []
+    """
+    Generations of one run, recording decides which of them are kept in generations
+
+    - full: all generations with all individuals
+    - best: only the best generation so far
+    - every: every interval-th generation
+    - ring: the last capacity generations
+    all but full keep only the best individual of a generation, so memory does not grow with the number of generations
+    (except every, which grows by one tour per interval)
+    """
+    __slots__ = ("generations", "best_gen", "recording", "interval", "capacity", "count")
+
+    def __init__(self, recording: str = "full", interval: int = 10, capacity: int = 100):
+        """
+        :param recording: one of RECORDINGS
+        :param interval: every interval-th generation is kept by every
+        :param capacity: number of last generations kept by ring
+        """
+        if recording not in RECORDINGS:
+            raise ValueError(f"unknown recording {recording}, use one of {RECORDINGS}")
+        self.recording: str = recording
+        self.interval: int = interval
+        self.capacity: int = capacity
+        self.generations: list[Generation] | deque[Generation] = deque(maxlen=capacity) if recording == "ring" else []
         self.best_gen: Generation | None = None
+        self.count: int = 0  # number of added generations, kept or not
+
+    def new_generation(self) -> Generation:
+        return Generation(best_only=self.recording != "full")
 
     def add(self, generation: Generation) -> Generation:
-        self.generations.append(generation)
+        generation.number = self.count
+        self.count += 1
         if self.best_gen is None:
             self.best_gen = generation
         if generation < self.best_gen:
             self.best_gen = generation
+
+        if self.recording == "best":
+            self.generations = [self.best_gen]
+        elif self.recording != "every" or generation.number % self.interval == 0:
+            self.generations.append(generation)
         return generation
 
     def get_best(self) -> Individual:
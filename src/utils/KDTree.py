@@ -0,0 +1,127 @@
+import numpy as np
+from numpy import ndarray
+
+
+class KDTree:
+    """
+    KD-tree with buckets of points in the leaves, for exact k nearest neighbour queries in NumPy
+
+    - points are split by the median of the widest dimension until at most leaf_size points remain
+    - queries are answered per leaf: queries which fall into the same leaf share one candidate set,
+      made of all leaves closer to the queries than their current k-th nearest distance
+    """
+
+    def __init__(self, points: ndarray, leaf_size: int = 32):
+        """
+        :param points: points (n, D)
+        :param leaf_size: maximum number of points in a leaf
+        """
+        self.points: ndarray = np.asarray(points, dtype=np.float64)
+        self.leaf_size: int = leaf_size
+        # internal nodes: split dimension and value and children, leaves: index into leaves (-1 for internal)
+        self.dimension: list[int] = []
+        self.split: list[float] = []
+        self.children: list[tuple[int, int]] = []
+        self.leaf: list[int] = []
+        # points of the leaves and their bounding boxes (L, 2, D)
+        self.leaves: list[ndarray] = []
+        self.build(np.arange(len(self.points)))
+        self.boxes: ndarray = np.array([[self.points[leaf].min(axis=0), self.points[leaf].max(axis=0)]
+                                        for leaf in self.leaves])
+        self.sizes: ndarray = np.array([len(leaf) for leaf in self.leaves])
+
+    def build(self, indices: ndarray) -> int:
+        node = len(self.leaf)
+        self.dimension.append(0)
+        self.split.append(0.0)
+        self.children.append((-1, -1))
+        self.leaf.append(-1)
+
+        if len(indices) <= self.leaf_size:
+            self.leaf[node] = len(self.leaves)
+            self.leaves.append(indices)
+            return node
+
+        points = self.points[indices]
+        dimension = int(np.argmax(np.ptp(points, axis=0)))
+        middle = len(indices) // 2
+        order = np.argpartition(points[:, dimension], middle)
+        self.dimension[node] = dimension
+        self.split[node] = float(points[order[middle], dimension])
+        left = self.build(indices[order[:middle]])
+        right = self.build(indices[order[middle:]])
+        self.children[node] = (left, right)
+        return node
+
+    def locate(self, queries: ndarray) -> ndarray:
+        """
+        :param queries: points (m, D)
+        :return: index of the leaf of every query (m,)
+        """
+        leaf = np.array(self.leaf)
+        dimension = np.array(self.dimension)
+        split = np.array(self.split)
+        children = np.array(self.children)
+        node = np.zeros(len(queries), dtype=np.int64)
+        internal = leaf[node] < 0
+        while np.any(internal):
+            current = node[internal]
+            right = queries[internal, dimension[current]] >= split[current]
+            node[internal] = children[current, right.astype(np.int64)]
+            internal = leaf[node] < 0
+        return leaf[node]
+
+    def box_distances(self, low: ndarray, high: ndarray) -> ndarray:
+        """
+        :return: distances between the box low..high and the boxes of all leaves (L,)
+        """
+        gap = np.maximum(0.0, np.maximum(self.boxes[:, 0] - high, low - self.boxes[:, 1]))
+        return np.sqrt(np.sum(gap ** 2, axis=1))
+
+    def query(self, queries: ndarray, k: int, exclude_self: bool = False) -> tuple[ndarray, ndarray]:
+        """
+        :param queries: points (m, D)
+        :param k: number of neighbours
+        :param exclude_self: queries are the points of the tree, do not return a point as its own neighbour
+        :return: distances (m, k) and indices (m, k) of the nearest points sorted by distance
+        """
+        queries = np.asarray(queries, dtype=np.float64)
+        wanted = k + 1 if exclude_self else k
+        wanted = min(wanted, len(self.points))
+        distances = np.empty((len(queries), wanted))
+        indices = np.empty((len(queries), wanted), dtype=np.int64)
+        located = self.locate(queries)
+
+        order = np.argsort(located, kind="stable")
+        groups = np.split(order, np.flatnonzero(np.diff(located[order])) + 1)
+        for group in groups:
+            group_queries = queries[group]
+            low, high = group_queries.min(axis=0), group_queries.max(axis=0)
+            gaps = self.box_distances(low, high)
+
+            # first bound from the closest leaves which hold at least wanted points
+            closest = np.argsort(gaps, kind="stable")
+            enough = np.searchsorted(np.cumsum(self.sizes[closest]), wanted) + 1
+            candidates = np.concatenate([self.leaves[i] for i in closest[:enough]])
+            bound = np.max(np.partition(self.distances(group_queries, candidates), wanted - 1, axis=1)[:, wanted - 1])
+
+            # every point closer than the bound lies in a leaf closer than the bound
+            candidates = np.concatenate([self.leaves[i] for i in np.flatnonzero(gaps <= bound)])
+            candidate_distances = self.distances(group_queries, candidates)
+            nearest = np.argpartition(candidate_distances, wanted - 1, axis=1)[:, :wanted]
+            nearest_distances = np.take_along_axis(candidate_distances, nearest, axis=1)
+            sort = np.argsort(nearest_distances, axis=1, kind="stable")
+            distances[group] = np.take_along_axis(nearest_distances, sort, axis=1)
+            indices[group] = candidates[np.take_along_axis(nearest, sort, axis=1)]
+
+        if exclude_self:
+            # drop the query itself, duplicates of its coordinates may be sorted in front of it
+            itself = indices == np.arange(len(queries))[:, np.newaxis]
+            itself[~np.any(itself, axis=1), -1] = True
+            keep = ~itself
+            distances = distances[keep].reshape(len(queries), -1)
+            indices = indices[keep].reshape(len(queries), -1)
+        return distances, indices
+
+    def distances(self, queries: ndarray, candidates: ndarray) -> ndarray:
+        return np.sqrt(np.sum((queries[:, np.newaxis, :] - self.points[candidates][np.newaxis, :, :]) ** 2, axis=-1))
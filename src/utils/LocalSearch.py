@@ -0,0 +1,199 @@
+from collections import deque
+
+import numpy as np
+from numpy import ndarray
+
+from src.utils.Genetic import tour_costs
+
+MOVES = ["2-opt", "or-opt"]
+
+# smallest improvement accepted, guards against cycling on rounding errors
+EPSILON = 1e-10
+
+
+def nearest_neighbours(distances: ndarray, k: int) -> ndarray:
+    """
+    :param distances: distance matrix (n, n), or LazyDistances of a large instance
+    :param k: number of neighbours
+    :return: k nearest cities of every city sorted by distance (n, k)
+    """
+    if not isinstance(distances, np.ndarray):
+        return distances.nearest(k)
+    n = len(distances)
+    k = min(k, n - 1)
+    distances = distances + np.diag(np.full(n, np.inf))
+    nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    order = np.argsort(np.take_along_axis(distances, nearest, axis=1), axis=1)
+    return np.take_along_axis(nearest, order, axis=1).astype(np.int32)
+
+
+class LocalSearch:
+    """
+    2-opt and Or-opt local search of closed tours, improves tours in place until no move of a city improves them
+
+    - only moves which create an edge from a city to one of its k nearest neighbours are tried
+    - don't-look bits, a city is looked at again only when one of its edges changed
+    - tour is an array of cities with positions of the cities, 2-opt reverses the shorter side of the tour
+    """
+
+    def __init__(self, distances: ndarray, neighbours: int | ndarray = 10, moves: tuple[str, ...] = ("2-opt", "or-opt"),
+                 segment: int = 3):
+        """
+        :param distances: distance matrix (n, n) or LazyDistances, symmetric
+        :param neighbours: number of nearest neighbours, or precomputed neighbour lists (n, k)
+        :param moves: moves from MOVES to use
+        :param segment: maximum length of segments moved by Or-opt
+        """
+        for move in moves:
+            if move not in MOVES:
+                raise ValueError(f"unknown move {move}, use one of {MOVES}")
+        self.distances: ndarray = distances
+        self.neighbours: ndarray = (nearest_neighbours(distances, neighbours) if np.isscalar(neighbours)
+                                    else np.asarray(neighbours))
+        self.moves: tuple[str, ...] = moves
+        self.segment: int = segment
+
+    def improve(self, tour: ndarray) -> float:
+        """
+        Improve tour in place
+        :param tour: tour (n,) of city indices
+        :return: change of the tour length (<= 0)
+        """
+        n = len(tour)
+        if n < 5:
+            return 0.0
+        position = np.empty(n, dtype=np.int64)
+        position[tour] = np.arange(n)
+
+        total = 0.0
+        queue = deque(tour.tolist())
+        queued = np.ones(n, dtype=bool)
+        while queue:
+            city = queue.popleft()
+            queued[city] = False
+
+            touched = None
+            if "2-opt" in self.moves:
+                touched = self.two_opt(tour, position, city)
+            if touched is None and "or-opt" in self.moves:
+                touched = self.or_opt(tour, position, city)
+            if touched is None:
+                continue
+
+            delta, cities = touched
+            total += delta
+            # cities with a changed edge are looked at again
+            for changed in cities:
+                if not queued[changed]:
+                    queued[changed] = True
+                    queue.append(changed)
+        return total
+
+    def improve_all(self, tours: ndarray, costs: ndarray | None = None) -> ndarray:
+        """
+        Improve all tours (NP, n) in place
+        :param costs: lengths of the tours (NP,), None to compute them
+        :return: new lengths of the tours (NP,)
+        """
+        costs = tour_costs(tours, self.distances) if costs is None else costs.copy()
+        for i, tour in enumerate(tours):
+            costs[i] += self.improve(tour)
+        return costs
+
+    def two_opt(self, tour: ndarray, position: ndarray, a: int) -> tuple[float, tuple] | None:
+        """
+        First-improving 2-opt move (neighbours tried from the nearest) which creates an edge from a to one of its neighbours, applied when found
+        :return: change of the length and cities with changed edges, None without improving move
+        """
+        d = self.distances
+        n = len(tour)
+        for forward in (True, False):
+            # a - b is the edge which is removed, b follows a (forward) or precedes it
+            b = tour[(position[a] + (1 if forward else -1)) % n]
+            removed = d[a, b]
+            for c in self.neighbours[a]:
+                gain = removed - d[a, c]
+                if gain <= EPSILON:
+                    # neighbours are sorted, no further neighbour can make a shorter edge
+                    break
+                e = tour[(position[c] + (1 if forward else -1)) % n]
+                if e == a:
+                    continue
+                delta = d[a, c] + d[b, e] - removed - d[c, e]
+                if delta < -EPSILON:
+                    if forward:
+                        # a b ... c e -> a c ... b e
+                        self.reverse(tour, position, position[b], position[c])
+                    else:
+                        # e c ... b a -> e b ... c a
+                        self.reverse(tour, position, position[c], position[b])
+                    return delta, (a, b, c, e)
+        return None
+
+    def or_opt(self, tour: ndarray, position: ndarray, s: int) -> tuple[float, tuple] | None:
+        """
+        First-improving Or-opt move of a segment starting at s next to one of the neighbours of s, applied when found
+        :return: change of the length and cities with changed edges, None without improving move
+        """
+        d = self.distances
+        n = len(tour)
+        start = position[s]
+        p = tour[start - 1]
+        for length in range(1, min(self.segment, n - 3) + 1):
+            e = tour[(start + length - 1) % n]
+            following = tour[(start + length) % n]
+            inside = set(tour[(start + np.arange(length)) % n].tolist())
+            removal = d[p, following] - d[p, s] - d[e, following]
+            for c in self.neighbours[s]:
+                if c in inside:
+                    continue
+                if removal + d[c, s] >= -EPSILON:
+                    break
+                successor = tour[(position[c] + 1) % n]
+                predecessor = tour[position[c] - 1]
+                # c s ... e successor
+                if successor not in inside:
+                    delta = removal + d[c, s] + d[e, successor] - d[c, successor]
+                    if delta < -EPSILON:
+                        self.move(tour, position, start, length, c, after=True)
+                        return delta, (p, s, e, following, c, successor)
+                # predecessor e ... s c
+                if predecessor not in inside:
+                    delta = removal + d[predecessor, e] + d[s, c] - d[predecessor, c]
+                    if delta < -EPSILON:
+                        self.move(tour, position, start, length, c, after=False)
+                        return delta, (p, s, e, following, c, predecessor)
+        return None
+
+    @staticmethod
+    def reverse(tour: ndarray, position: ndarray, i: int, j: int):
+        """
+        Reverse the cyclic segment of positions i..j, reverses the complement instead when it is shorter
+        """
+        n = len(tour)
+        length = (j - i) % n + 1
+        if 2 * length > n:
+            i, j, length = (j + 1) % n, (i - 1) % n, n - length
+        if i <= j:
+            tour[i:j + 1] = tour[i:j + 1][::-1]
+            position[tour[i:j + 1]] = np.arange(i, j + 1)
+        else:
+            indices = (i + np.arange(length)) % n
+            tour[indices] = tour[indices[::-1]]
+            position[tour[indices]] = indices
+
+    @staticmethod
+    def move(tour: ndarray, position: ndarray, start: int, length: int, c: int, after: bool):
+        """
+        Move the segment of positions start..start+length-1 right after c, or reversed right before c
+        """
+        n = len(tour)
+        rolled = np.roll(tour, -((start + length) % n))
+        # rolled is the rest of the tour followed by the segment
+        rest, segment = rolled[:n - length], rolled[n - length:]
+        k = (position[c] - start - length) % n
+        if after:
+            tour[:] = np.concatenate((rest[:k + 1], segment, rest[k + 1:]))
+        else:
+            tour[:] = np.concatenate((rest[:k], segment[::-1], rest[k:]))
+        position[tour] = np.arange(n)
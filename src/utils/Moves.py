@@ -0,0 +1,119 @@
+# Moves on closed tours (permutations of city indices) with O(1) cost deltas from a shared distance matrix
+# every function takes one tour (n,) with scalar positions or a population (NP, n) with positions (NP,)
+# distances are expected symmetric
+
+import numpy as np
+from numpy import ndarray
+
+
+def _prepare(tours: ndarray, *positions) -> tuple[ndarray, ndarray, list[ndarray]]:
+    tours2d = np.atleast_2d(tours)
+    rows = np.arange(len(tours2d))
+    return tours2d, rows, [np.broadcast_to(np.asarray(p), rows.shape) for p in positions]
+
+
+def _result(tours: ndarray, values: ndarray) -> float | ndarray:
+    return values[0] if tours.ndim == 1 else values
+
+
+def swap_delta(tours: ndarray, i, j, distances: ndarray) -> float | ndarray:
+    """
+    Change of the tour length after swapping cities at positions i and j (i != j)
+    """
+    t, rows, (i, j) = _prepare(tours, i, j)
+    n = t.shape[1]
+    a, b, c = t[rows, (i - 1) % n], t[rows, i], t[rows, (i + 1) % n]
+    d, e, f = t[rows, (j - 1) % n], t[rows, j], t[rows, (j + 1) % n]
+    delta = (distances[a, e] + distances[e, c] + distances[d, b] + distances[b, f]
+             - distances[a, b] - distances[b, c] - distances[d, e] - distances[e, f])
+    # neighbouring cities share the edge between them, it stays in the tour
+    adjacent = np.isin((j - i) % n, (1, n - 1))
+    return _result(tours, delta + 2 * adjacent * distances[b, e])
+
+
+def apply_swap(tours: ndarray, i, j) -> ndarray:
+    t, rows, (i, j) = _prepare(tours, i, j)
+    t[rows, i], t[rows, j] = t[rows, j], t[rows, i]
+    return tours
+
+
+def two_opt_delta(tours: ndarray, i, j, distances: ndarray) -> float | ndarray:
+    """
+    Change of the tour length after reversing the segment of positions i..j (i < j)
+    """
+    t, rows, (i, j) = _prepare(tours, i, j)
+    n = t.shape[1]
+    a, b = t[rows, (i - 1) % n], t[rows, i]
+    e, f = t[rows, j], t[rows, (j + 1) % n]
+    delta = distances[a, e] + distances[b, f] - distances[a, b] - distances[e, f]
+    # reversing the whole tour gives the same cycle
+    return _result(tours, np.where(j - i == n - 1, 0.0, delta))
+
+
+def apply_two_opt(tours: ndarray, i, j) -> ndarray:
+    if tours.ndim == 1:
+        # single tour touches only the reversed segment
+        tours[i:j + 1] = tours[i:j + 1][::-1]
+        return tours
+    t, rows, (i, j) = _prepare(tours, i, j)
+    k = np.arange(t.shape[1])
+    reversed_ = (k >= i[:, np.newaxis]) & (k <= j[:, np.newaxis])
+    source = np.where(reversed_, i[:, np.newaxis] + j[:, np.newaxis] - k, k)
+    t[:] = np.take_along_axis(t, source, axis=1)
+    return tours
+
+
+def or_opt_delta(tours: ndarray, i, length, j, distances: ndarray, reverse=False) -> float | ndarray:
+    """
+    Change of the tour length after moving the segment of positions i..i+length-1 (i + length <= n)
+    between the cities at positions j and j+1 (j outside i-1..i+length-1), optionally reversed
+    """
+    t, rows, (i, length, j, reverse) = _prepare(tours, i, length, j, reverse)
+    n = t.shape[1]
+    a, s = t[rows, (i - 1) % n], t[rows, i]
+    e, c = t[rows, i + length - 1], t[rows, (i + length) % n]
+    p, q = t[rows, j], t[rows, (j + 1) % n]
+    removal = distances[a, c] - distances[a, s] - distances[e, c]
+    first, last = np.where(reverse, e, s), np.where(reverse, s, e)
+    insertion = distances[p, first] + distances[last, q] - distances[p, q]
+    return _result(tours, removal + insertion)
+
+
+def apply_or_opt(tours: ndarray, i, length, j, reverse=False) -> ndarray:
+    if tours.ndim == 1:
+        segment = (tours[i:i + length][::-1] if reverse else tours[i:i + length]).copy()
+        if j > i:
+            tours[i:j - length + 1] = tours[i + length:j + 1].copy()
+            tours[j - length + 1:j + 1] = segment
+        else:
+            tours[j + 1 + length:i + length] = tours[j + 1:i].copy()
+            tours[j + 1:j + 1 + length] = segment
+        return tours
+    t, rows, (i, length, j, reverse) = _prepare(tours, i, length, j, reverse)
+    k = np.arange(t.shape[1])
+    forward = j > i
+    # moving the segment rotates the block between the segment and the insertion point
+    low = np.where(forward, i, j + 1)[:, np.newaxis]
+    high = np.where(forward, j, i + length - 1)[:, np.newaxis]
+    shift = np.where(forward, length, -length)[:, np.newaxis]
+    block = (k >= low) & (k <= high)
+    source = np.where(block, low + (k - low + shift) % (high - low + 1), k)
+
+    # segment now lies at start..start+length-1
+    start = np.where(forward, j - length + 1, j + 1)[:, np.newaxis]
+    segment = (k >= start) & (k < start + length[:, np.newaxis]) & reverse[:, np.newaxis]
+    mirrored = np.clip(2 * start + length[:, np.newaxis] - 1 - k, 0, len(k) - 1)
+    source = np.where(segment, np.take_along_axis(source, mirrored, axis=1), source)
+    t[:] = np.take_along_axis(t, source, axis=1)
+    return tours
+
+
+def insertion_delta(tours: ndarray, i, j, distances: ndarray) -> float | ndarray:
+    """
+    Change of the tour length after moving the city at position i between the cities at positions j and j+1
+    """
+    return or_opt_delta(tours, i, 1, j, distances)
+
+
+def apply_insertion(tours: ndarray, i, j) -> ndarray:
+    return apply_or_opt(tours, i, 1, j)
@@ -0,0 +1,209 @@
+import os
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from numpy import ndarray
+
+# objective of the worker process, set once by the pool initializer
+_objective: callable = None
+_vectorized: bool = True
+
+
+def _initialize_worker(function: callable, vectorized: bool):
+    global _objective, _vectorized
+    _objective = function
+    _vectorized = vectorized
+
+
+def _evaluate_chunk(chunk: ndarray) -> ndarray:
+    if _vectorized:
+        return np.asarray(_objective(chunk), dtype=np.float64)
+    return np.array([_objective(xx) for xx in chunk], dtype=np.float64)
+
+
+# shared memory blocks attached by the worker process, by name
+_attached: dict[str, shared_memory.SharedMemory] = {}
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    if name not in _attached:
+        _attached[name] = shared_memory.SharedMemory(name=name)
+    return _attached[name]
+
+
+def _evaluate_range(population_name: str, fitness_name: str, shape: tuple[int, int], start: int, stop: int):
+    population = np.ndarray(shape, dtype=np.float64, buffer=_attach(population_name).buf)
+    fitness = np.ndarray(shape[:1], dtype=np.float64, buffer=_attach(fitness_name).buf)
+    fitness[start:stop] = _evaluate_chunk(population[start:stop])
+
+
+class ProcessPoolBackend:
+    """
+    Evaluator backend which evaluates populations in a pool of worker processes
+
+    - one pool at a time, the function is sent to every worker only once (pool initializer),
+      tasks then carry only the chunks of the population, the pool is replaced when the function changes
+    - values are returned in the order of the population
+    - meant for expensive objectives, for the cheap test functions the overhead of the processes is bigger than the gain
+    """
+
+    def __init__(self, workers: int | None = None, chunksize: int | None = None, vectorized: bool = True):
+        """
+        :param workers: number of worker processes, None for number of cpus
+        :param chunksize: number of points per task, None to split population evenly among workers
+        :param vectorized: the function accepts (NP, D) populations, otherwise workers evaluate point by point
+        """
+        self.workers: int = workers or os.cpu_count() or 1
+        self.chunksize: int | None = chunksize
+        self.vectorized: bool = vectorized
+        self.executor: ProcessPoolExecutor | None = None
+        self.function: callable = None
+
+    def pool(self, function: callable) -> ProcessPoolExecutor:
+        if self.executor is None or self.function is not function:
+            # workers of the previous function are shut down, so at most workers processes are alive
+            self.shutdown()
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_initialize_worker,
+                                                initargs=(function, self.vectorized))
+            self.function = function
+        return self.executor
+
+    def chunks(self, xx: ndarray) -> list[ndarray]:
+        chunksize = self.chunksize or -(-len(xx) // self.workers)
+        return [xx[start:start + chunksize] for start in range(0, len(xx), chunksize)]
+
+    def evaluate(self, function: callable, xx: ndarray) -> ndarray:
+        """
+        :param function: function to evaluate
+        :param xx: population (NP, D)
+        :return: values (NP,) in the order of the population
+        """
+        return np.concatenate(list(self.pool(function).map(_evaluate_chunk, self.chunks(xx))))
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+        self.executor = None
+        self.function = None
+
+    def close(self):
+        self.shutdown()
+
+    def __enter__(self) -> 'ProcessPoolBackend':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class SharedBlock:
+    """
+    Population (NP, D) and its fitness (NP,) in shared memory blocks
+    the block keeps no view of the population, so the array handed to the algorithm can be garbage collected
+    """
+
+    def __init__(self, shape: tuple[int, int]):
+        self.shape: tuple[int, int] = shape
+        self.population_memory = shared_memory.SharedMemory(create=True, size=max(1, shape[0] * shape[1] * 8))
+        self.fitness_memory = shared_memory.SharedMemory(create=True, size=max(1, shape[0] * 8))
+        self.fitness: ndarray = np.ndarray(shape[:1], dtype=np.float64, buffer=self.fitness_memory.buf)
+        self.address: int = self.population().__array_interface__["data"][0]
+
+    def population(self) -> ndarray:
+        return np.ndarray(self.shape, dtype=np.float64, buffer=self.population_memory.buf)
+
+    def locate(self, xx: ndarray) -> int | None:
+        """
+        :param xx: population
+        :return: index of the first row of xx in this block, None if xx are not whole rows of this block
+        """
+        if xx.dtype != np.float64 or xx.ndim != 2 or xx.shape[1] != self.shape[1] or not xx.flags.c_contiguous:
+            return None
+        offset = xx.__array_interface__["data"][0] - self.address
+        row = self.shape[1] * 8
+        if offset < 0 or offset % row or offset // row + len(xx) > self.shape[0]:
+            return None
+        return offset // row
+
+    def release(self):
+        self.fitness = None
+        for memory in (self.population_memory, self.fitness_memory):
+            try:
+                memory.close()
+            except BufferError:
+                # the population is still used somewhere, the mapping goes away with it
+                pass
+            memory.unlink()
+
+
+class SharedMemoryBackend(ProcessPoolBackend):
+    """
+    Process pool backend which never sends the points to the workers
+
+    - buffer() allocates population arrays in shared memory, algorithms keep their populations in them
+    - populations from these buffers are evaluated in place, workers get only names of the blocks and index ranges
+      and write the values into the shared fitness block
+    - other populations are first copied into a shared scratch block (one local copy, still no pickling)
+    """
+
+    def __init__(self, workers: int | None = None, chunksize: int | None = None, vectorized: bool = True):
+        super().__init__(workers, chunksize, vectorized)
+        self.blocks: dict[int, SharedBlock] = {}
+        self.scratch: SharedBlock | None = None
+
+    def buffer(self, shape: tuple[int, int]) -> ndarray:
+        """
+        :param shape: (NP, D)
+        :return: array in shared memory, its block is released when the array is garbage collected
+        """
+        block = SharedBlock(shape)
+        self.blocks[id(block)] = block
+        population = block.population()
+        weakref.finalize(population, self._release, id(block))
+        return population
+
+    def _release(self, key: int):
+        block = self.blocks.pop(key, None)
+        if block is not None:
+            block.release()
+
+    def _locate(self, xx: ndarray) -> tuple[SharedBlock, int]:
+        for block in self.blocks.values():
+            start = block.locate(xx)
+            if start is not None:
+                return block, start
+
+        if self.scratch is None or self.scratch.shape[0] < len(xx) or self.scratch.shape[1] != xx.shape[1]:
+            if self.scratch is not None:
+                self.scratch.release()
+            self.scratch = SharedBlock(xx.shape)
+        self.scratch.population()[:len(xx)] = xx
+        return self.scratch, 0
+
+    def evaluate(self, function: callable, xx: ndarray) -> ndarray:
+        """
+        :param function: function to evaluate
+        :param xx: population (NP, D), ideally rows of a buffer()
+        :return: values (NP,) in the order of the population
+        """
+        block, start = self._locate(xx)
+        stop = start + len(xx)
+        chunksize = self.chunksize or -(-len(xx) // self.workers)
+        pool = self.pool(function)
+        tasks = [pool.submit(_evaluate_range, block.population_memory.name, block.fitness_memory.name, block.shape,
+                             first, min(first + chunksize, stop))
+                 for first in range(start, stop, chunksize)]
+        for task in tasks:
+            task.result()
+        return block.fitness[start:stop].copy()
+
+    def close(self):
+        super().close()
+        for block in self.blocks.values():
+            block.release()
+        self.blocks = {}
+        if self.scratch is not None:
+            self.scratch.release()
+            self.scratch = None
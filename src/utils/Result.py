@@ -3,18 +3,79 @@ from numpy import ndarray
 
 
 class Position:
+    __slots__ = ("position", "value")
 
     def __init__(self, value: float, position: ndarray):
         self.position = position
         self.value = value
 
 
+class Columns:
+    """
+    Growable preallocated columns of evaluated positions (N, D) and their values (N,)
+    capacity doubles when full, so appending blocks is amortized O(block)
+    """
+    __slots__ = ("positions", "values", "size")
+
+    def __init__(self, capacity: int = 16):
+        self.positions: ndarray | None = None  # allocated with the first block, when D is known
+        self.values: ndarray = np.empty(capacity)
+        self.size: int = 0
+
+    def append(self, values: ndarray, positions: ndarray) -> tuple[int, int]:
+        """
+        :param values: (n,)
+        :param positions: (n, D)
+        :return: start and stop of the appended rows
+        """
+        start, stop = self.size, self.size + len(values)
+        if self.positions is None:
+            self.positions = np.empty((len(self.values), positions.shape[1]))
+        if stop > len(self.values):
+            capacity = max(stop, 2 * len(self.values))
+            self.values = np.resize(self.values, capacity)
+            self.positions = np.resize(self.positions, (capacity, self.positions.shape[1]))
+        self.values[start:stop] = values
+        self.positions[start:stop] = positions
+        self.size = stop
+        return start, stop
+
+
 class Iteration:
+    """
+    Evaluated positions of one iteration, stored in columns
+    until the iteration is added to a Result it has its own columns, then its rows live in the columns of the Result
+    """
+    __slots__ = ("columns", "start", "stop", "best")
 
     def __init__(self):
-        self.history = []
+        self.columns: Columns = Columns()
+        self.start: int = 0
+        self.stop: int = 0
         self.best: Position = Position(np.inf, np.array([0]))
 
+    @property
+    def values(self) -> ndarray:
+        return self.columns.values[self.start:self.stop]
+
+    @property
+    def positions(self) -> ndarray:
+        if self.columns.positions is None:
+            return np.empty((0, len(self.best.position)))
+        return self.columns.positions[self.start:self.stop]
+
+    @property
+    def history(self) -> list[Position]:
+        """
+        Positions of the iteration, views into the columns
+        """
+        return [Position(value, position) for value, position in zip(self.values, self.positions)]
+
+    def _append(self, values: ndarray, positions: ndarray):
+        if self.stop != self.columns.size:
+            raise ValueError("positions can be added only to the last iteration of a result")
+        _, self.stop = self.columns.append(values, positions)
+
     def add_position(self, position: Position) -> 'Iteration':
         """
         Add position to the iteration
@@ -22,26 +83,54 @@ class Iteration:
         :param position:
         :return:
         """
-        self.history.append(position)
-        if self.best.value == np.inf:
-            self.best = position
-        if position.value <= self.best.value:
-            self.best = position
+        if np.isfinite(position.value):
+            self._append(np.array([position.value]), np.asarray(position.position)[np.newaxis])
+        if self.best.value == np.inf or position.value <= self.best.value:
+            # own copy, the position may be a view keeping a whole population alive
+            self.best = Position(position.value, np.array(position.position))
+        return self
+
+    def add_population(self, values: ndarray, population: ndarray) -> 'Iteration':
+        """
+        Add all evaluated positions of a population (NP, D) to the iteration
+        positions are copied into the columns, positions left unevaluated (inf) are skipped
+        the best position is copied as well, so the iteration does not keep the population alive
+        :param values: (NP,)
+        :param population: (NP, D)
+        :return:
+        """
+        evaluated = np.isfinite(values)
+        if not np.any(evaluated):
+            return self
+        if not np.all(evaluated):
+            values, population = values[evaluated], population[evaluated]
+        self._append(values, population)
+        best = np.argmin(values)
+        if values[best] <= self.best.value:
+            self.best = Position(values[best], population[best].copy())
         return self
 
     def set_best(self, best: Position) -> 'Iteration':
         self.best = best
         return self
 
-    def get_best(self) -> (float, float, float):
-        return self.best.value, self.best.position[0], self.best.position[1]
+    def get_best(self) -> tuple:
+        """
+        :return: best value followed by all coordinates of the best position
+        """
+        return self.best.value, *self.best.position
 
 
 class Result:
+    """
+    Iterations of one run, evaluated positions of all iterations are kept in one set of columns
+    positions (N, D), values (N,) and offsets of the iterations into them
+    """
+    __slots__ = ("iterations", "best", "columns")
 
     def __init__(self):
         self.iterations = []
-
+        self.columns: Columns = Columns(1024)
         self.best = Position(np.inf, np.array([0]))
 
     def add_iteration(self, iteration: Iteration) -> 'Result':
@@ -51,6 +140,13 @@ class Result:
         :param iteration:
         :return:
         """
+        if iteration.stop > iteration.start:
+            start, stop = self.columns.append(iteration.values, iteration.positions)
+        else:
+            start = stop = self.columns.size
+        # rows of the iteration now live in the columns of the result
+        iteration.columns, iteration.start, iteration.stop = self.columns, start, stop
+
         if self.best.value == np.inf:
             self.best = iteration.best
         self.iterations.append(iteration)
@@ -58,5 +154,23 @@ class Result:
             self.best = iteration.best
         return self
 
-    def get_best(self) -> (float, float, float):
-        return self.best, self.best.position[0], self.best.position[1]
+    @property
+    def values(self) -> ndarray:
+        return self.columns.values[:self.columns.size]
+
+    @property
+    def positions(self) -> ndarray | None:
+        return None if self.columns.positions is None else self.columns.positions[:self.columns.size]
+
+    @property
+    def offsets(self) -> ndarray:
+        """
+        :return: start of every iteration in values and positions, followed by their total number
+        """
+        return np.array([iteration.start for iteration in self.iterations] + [self.columns.size])
+
+    def get_best(self) -> tuple:
+        """
+        :return: best Position followed by all coordinates of the best position
+        """
+        return self.best, *self.best.position
@@ -0,0 +1,203 @@
+# Low-discrepancy sequences in the unit cube [0, 1)^D, they cover the searchspace more evenly than uniform samples
+# both are generated in chunks, so they can be streamed without keeping the drawn points
+
+import numpy as np
+from numpy import ndarray
+
+# initial direction numbers m_1, m_2, ... of dimensions 2, 3, ... (Joe & Kuo, new-joe-kuo-6.21201)
+# dimension 1 is the van der Corput sequence, dimensions beyond the table get random odd direction numbers
+JOE_KUO = [
+    [1],
+    [1, 3],
+    [1, 3, 1],
+    [1, 1, 1],
+    [1, 1, 3, 3],
+    [1, 3, 5, 13],
+    [1, 1, 5, 5, 17],
+    [1, 1, 5, 5, 5],
+    [1, 1, 7, 11, 19],
+    [1, 1, 5, 1, 1],
+    [1, 1, 1, 3, 11],
+    [1, 3, 5, 5, 31],
+    [1, 3, 3, 9, 7, 49],
+    [1, 1, 1, 15, 21, 21],
+    [1, 3, 1, 13, 27, 49],
+    [1, 1, 1, 15, 7, 5],
+    [1, 3, 1, 15, 13, 25],
+    [1, 1, 5, 5, 19, 61],
+    [1, 3, 7, 11, 23, 15, 103],
+    [1, 3, 7, 13, 13, 15, 69],
+]
+
+BITS = 32
+
+
+def primes(count: int) -> list[int]:
+    """
+    :param count: number of primes
+    :return: first count primes
+    """
+    found = []
+    candidate = 2
+    while len(found) < count:
+        if all(candidate % p for p in found if p * p <= candidate):
+            found.append(candidate)
+        candidate += 1
+    return found
+
+
+def _multiply(a: int, b: int, modulus: int, degree: int) -> int:
+    # product of two polynomials over GF(2) (bits are coefficients) modulo polynomial of given degree
+    product = 0
+    while b:
+        if b & 1:
+            product ^= a
+        b >>= 1
+        a <<= 1
+        if a >> degree & 1:
+            a ^= modulus
+    return product
+
+
+def _is_primitive(polynomial: int, degree: int) -> bool:
+    # x generates the whole multiplicative group of GF(2^degree), so its order is 2^degree - 1
+    order = (1 << degree) - 1
+    factors = {p for p in range(2, order + 1) if order % p == 0 and all(p % q for q in range(2, int(p ** 0.5) + 1))}
+
+    def power(exponent: int) -> int:
+        result, base = 1, 2
+        while exponent:
+            if exponent & 1:
+                result = _multiply(result, base, polynomial, degree)
+            base = _multiply(base, base, polynomial, degree)
+            exponent >>= 1
+        return result
+
+    return power(order) == 1 and all(power(order // p) != 1 for p in factors)
+
+
+def primitive_polynomials(count: int) -> list[tuple[int, int]]:
+    """
+    Primitive polynomials over GF(2) ordered by degree (starting with x + 1) and then by coefficients
+    :param count: number of polynomials
+    :return: (degree s, a) pairs, a holds the inner coefficients a_1 ... a_{s-1} like in the Joe & Kuo tables
+    """
+    found = [(1, 0)][:count]
+    degree = 1
+    while len(found) < count:
+        degree += 1
+        for a in range(1 << (degree - 1)):
+            if len(found) == count:
+                break
+            # x^s + a_1 x^{s-1} + ... + a_{s-1} x + 1
+            if _is_primitive(1 << degree | a << 1 | 1, degree):
+                found.append((degree, a))
+    return found
+
+
+class SobolSequence:
+    """
+    Sobol sequence randomized by a digital shift (xor with random bits)
+    the plain sequence starts with the centre of the domain, the optimum of many test functions
+    """
+
+    def __init__(self, dimension: int, seed: int | None = None, randomized: bool = True):
+        """
+        :param dimension: dimension of the points
+        :param seed: seed of the digital shift and of direction numbers beyond the table, None for a random shift
+        :param randomized: False for the plain (unshifted) sequence
+        """
+        self.dimension: int = dimension
+        self.index: int = 0
+        rng = np.random.default_rng(seed)
+        self.directions: ndarray = self.direction_numbers(dimension, np.random.default_rng(0 if seed is None else seed))
+        self.shift: ndarray = (rng.integers(0, 1 << BITS, dimension, dtype=np.uint64) if randomized
+                               else np.zeros(dimension, dtype=np.uint64))
+
+    @staticmethod
+    def direction_numbers(dimension: int, rng: np.random.Generator) -> ndarray:
+        """
+        :return: direction numbers v (BITS, D) scaled to BITS bits
+        """
+        v = np.zeros((BITS, dimension), dtype=np.uint64)
+        # first dimension: v_k = 2^(BITS - k)
+        v[:, 0] = [1 << (BITS - 1 - k) for k in range(BITS)]
+
+        for j, (s, a) in enumerate(primitive_polynomials(dimension - 1), start=1):
+            if j <= len(JOE_KUO) and len(JOE_KUO[j - 1]) == s:
+                m = list(JOE_KUO[j - 1])
+            else:
+                # any odd m_k < 2^k gives a valid Sobol sequence
+                m = [int(rng.integers(0, 1 << (k - 1))) * 2 + 1 for k in range(1, s + 1)]
+
+            for k in range(s, BITS):
+                # m_k = 2 a_1 m_{k-1} ^ 4 a_2 m_{k-2} ^ ... ^ 2^s m_{k-s} ^ m_{k-s}
+                value = m[k - s] ^ (m[k - s] << s)
+                for i in range(1, s):
+                    if a >> (s - 1 - i) & 1:
+                        value ^= m[k - i] << i
+                m.append(value)
+
+            v[:, j] = [m[k] << (BITS - 1 - k) for k in range(BITS)]
+        return v
+
+    def sample(self, n: int) -> ndarray:
+        """
+        Next n points of the sequence
+        :param n: number of points
+        :return: (n, D) in [0, 1)
+        """
+        index = np.arange(self.index, self.index + n, dtype=np.uint64)
+        self.index += n
+        # point of index i is xor of direction numbers of set bits of its gray code
+        gray = index ^ (index >> np.uint64(1))
+        x = np.tile(self.shift, (n, 1))
+        for k in range(BITS):
+            x ^= np.where((gray >> np.uint64(k) & np.uint64(1)).astype(bool)[:, np.newaxis], self.directions[k], 0)
+        return x / float(1 << BITS)
+
+
+class HaltonSequence:
+    """
+    Halton sequence (radical inverse in the first D prime bases), randomized by a random shift modulo 1
+    good for low dimensions, higher dimensions with big bases are strongly correlated
+    """
+
+    def __init__(self, dimension: int, seed: int | None = None, randomized: bool = True):
+        """
+        :param dimension: dimension of the points
+        :param seed: seed of the random shift, None for a random shift
+        :param randomized: False for the plain (unshifted) sequence
+        """
+        self.dimension: int = dimension
+        self.bases: list[int] = primes(dimension)
+        # index 0 is the origin in all bases, so start with 1
+        self.index: int = 1
+        self.shift: ndarray = (np.random.default_rng(seed).uniform(size=dimension) if randomized
+                               else np.zeros(dimension))
+
+    def sample(self, n: int) -> ndarray:
+        """
+        Next n points of the sequence
+        :param n: number of points
+        :return: (n, D) in [0, 1)
+        """
+        index = np.arange(self.index, self.index + n, dtype=np.int64)
+        self.index += n
+        x = np.empty((n, self.dimension))
+        for j, base in enumerate(self.bases):
+            remaining = index.copy()
+            value = np.zeros(n)
+            factor = 1.0 / base
+            while np.any(remaining):
+                value += remaining % base * factor
+                remaining //= base
+                factor /= base
+            x[:, j] = value
+        return (x + self.shift) % 1.0
+
+
+SEQUENCES = {
+    "sobol": SobolSequence,
+    "halton": HaltonSequence,
+}
@@ -0,0 +1,207 @@
+import asyncio
+import json
+import threading
+
+import numpy as np
+from numpy import ndarray
+
+
+class ServiceError(Exception):
+    """
+    Raised when the evaluation service does not answer a point even after all retries
+    """
+
+
+class ServiceFunction:
+    """
+    Objective evaluated by a local evaluation service (HTTP over TCP or Unix socket)
+
+    - drop-in replacement of the test functions (range, dimension, __name__ and (D,) or (NP, D) call)
+    - points of a population are sent as concurrent requests, at most max_in_flight at once
+    - connections are kept alive and reused between requests and between calls
+    - every request has a timeout and is retried on failure
+
+    protocol: POST /evaluate with {"x": [...]} -> {"value": float}
+    """
+
+    def __init__(self, range: tuple[float, float], dimension: int, name: str = "service",
+                 host: str = "127.0.0.1", port: int | None = None, path: str | None = None,
+                 max_in_flight: int = 16, timeout: float = 10.0, retries: int = 3, backoff: float = 0.05):
+        """
+        :param range: search domain of the objective
+        :param dimension: dimension of the objective
+        :param name: name of the objective (used in results)
+        :param host: host of the service
+        :param port: TCP port of the service
+        :param path: Unix socket of the service (used instead of host and port)
+        :param max_in_flight: maximum number of concurrent requests (and pooled connections)
+        :param timeout: timeout of one request in seconds
+        :param retries: number of retries of a failed request
+        :param backoff: delay before the first retry in seconds, doubled with every next retry
+        """
+        self.range: tuple[float, float] = range
+        self.dimension: int = dimension
+        self.__name__: str = name
+        self.host: str = host
+        self.port: int | None = port
+        self.path: str | None = path
+        self.max_in_flight: int = max_in_flight
+        self.timeout: float = timeout
+        self.retries: int = retries
+        self.backoff: float = backoff
+        # own loop, so pooled connections survive between calls
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        self.idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    @property
+    def cache_key(self) -> str:
+        endpoint = self.path if self.path is not None else f"{self.host}:{self.port}"
+        return f"{self.__name__}(D={self.dimension}, service={endpoint})"
+
+    def __call__(self, xx: ndarray) -> float | ndarray:
+        xx = np.asarray(xx, dtype=np.float64)
+        if xx.ndim == 1:
+            return self.loop.run_until_complete(self._evaluate_all(xx[np.newaxis]))[0]
+        return self.loop.run_until_complete(self._evaluate_all(xx))
+
+    async def _evaluate_all(self, xx: ndarray) -> ndarray:
+        in_flight = asyncio.Semaphore(self.max_in_flight)
+
+        async def evaluate(point: ndarray) -> float:
+            async with in_flight:
+                return await self._evaluate(point)
+
+        return np.array(await asyncio.gather(*(evaluate(point) for point in xx)), dtype=np.float64)
+
+    async def _evaluate(self, point: ndarray) -> float:
+        body = json.dumps({"x": point.tolist()}).encode()
+        for attempt in range(self.retries + 1):
+            connection = None
+            try:
+                connection = self.idle.pop() if self.idle else await asyncio.wait_for(self._connect(), self.timeout)
+                value = await asyncio.wait_for(self._request(connection, body), self.timeout)
+                self.idle.append(connection)
+                return value
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, ServiceError) as error:
+                if connection is not None:
+                    connection[1].close()
+                if attempt == self.retries:
+                    raise ServiceError(f"evaluation of {self.__name__} failed after {attempt + 1} attempts") from error
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+
+    async def _connect(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        if self.path is not None:
+            return await asyncio.open_unix_connection(self.path)
+        return await asyncio.open_connection(self.host, self.port)
+
+    async def _request(self, connection: tuple[asyncio.StreamReader, asyncio.StreamWriter], body: bytes) -> float:
+        reader, writer = connection
+        writer.write(b"POST /evaluate HTTP/1.1\r\n"
+                     b"Host: " + self.host.encode() + b"\r\n"
+                     b"Content-Type: application/json\r\n"
+                     b"Connection: keep-alive\r\n"
+                     b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+        await writer.drain()
+
+        status, headers, response = await read_http_message(reader)
+        if not status.split(b" ")[1:2] == [b"200"]:
+            raise ServiceError(f"service answered {status.decode(errors='replace')}")
+        return float(json.loads(response)["value"])
+
+    def close(self):
+        for _, writer in self.idle:
+            writer.close()
+        self.idle = []
+        self.loop.close()
+
+
+async def read_http_message(reader: asyncio.StreamReader) -> tuple[bytes, dict[bytes, bytes], bytes]:
+    """
+    Read one HTTP/1.1 message (request or response) with Content-Length body
+    :return: start line, headers (lower case names) and body
+    """
+    start = (await reader.readuntil(b"\r\n")).rstrip()
+    headers = {}
+    while (line := (await reader.readuntil(b"\r\n")).rstrip()) != b"":
+        name, _, value = line.partition(b":")
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get(b"content-length", b"0")))
+    return start, headers, body
+
+
+class LocalEvaluationServer:
+    """
+    Local stand-in of an evaluation service, serves one function over HTTP (TCP or Unix socket)
+    runs its own event loop in a background thread, delay simulates an expensive evaluation
+    """
+
+    def __init__(self, function: callable, host: str = "127.0.0.1", port: int = 0, path: str | None = None,
+                 delay: float = 0.0):
+        """
+        :param function: function to serve
+        :param host: host to listen on
+        :param port: TCP port to listen on, 0 for any free port
+        :param path: Unix socket to listen on (used instead of host and port)
+        :param delay: time of one evaluation in seconds
+        """
+        self.function: callable = function
+        self.host: str = host
+        self.port: int = port
+        self.path: str | None = path
+        self.delay: float = delay
+        self.requests: int = 0
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        self.server: asyncio.Server | None = None
+        self.connections: dict[asyncio.Task, asyncio.StreamWriter] = {}
+        self.thread: threading.Thread | None = None
+
+    def start(self) -> 'LocalEvaluationServer':
+        if self.path is not None:
+            self.server = self.loop.run_until_complete(asyncio.start_unix_server(self._handle, self.path))
+        else:
+            self.server = self.loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+            self.port = self.server.sockets[0].getsockname()[1]
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections[asyncio.current_task()] = writer
+        try:
+            while True:
+                _, _, body = await read_http_message(reader)
+                self.requests += 1
+                await asyncio.sleep(self.delay)
+                value = self.function(np.array(json.loads(body)["x"]))
+                response = json.dumps({"value": float(value)}).encode()
+                writer.write(b"HTTP/1.1 200 OK\r\n"
+                             b"Content-Type: application/json\r\n"
+                             b"Connection: keep-alive\r\n"
+                             b"Content-Length: " + str(len(response)).encode() + b"\r\n\r\n" + response)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.connections.pop(asyncio.current_task(), None)
+            writer.close()
+
+    def stop(self):
+        async def shutdown():
+            self.server.close()
+            # clients may keep their connections alive, so close them from this side
+            handlers = list(self.connections)
+            for writer in self.connections.values():
+                writer.close()
+            await asyncio.gather(*handlers, return_exceptions=True)
+            await self.server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    def __enter__(self) -> 'LocalEvaluationServer':
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
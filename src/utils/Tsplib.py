@@ -0,0 +1,247 @@
+# TSP instances, random or loaded from TSPLIB .tsp files
+# distances follow the TSPLIB conventions (rounding of EUC_2D, CEIL_2D, ATT and GEO)
+
+import math
+from numbers import Integral
+
+import numpy as np
+from numpy import ndarray
+
+from src.utils.Genetic import Point
+from src.utils.KDTree import KDTree
+
+EDGE_WEIGHT_TYPES = ["EUC", "EUC_2D", "CEIL_2D", "ATT", "GEO", "EXPLICIT"]
+
+# weight types which are monotone in the plain euclidean distance, so the KD-tree finds their nearest neighbours
+PLANAR = ["EUC", "EUC_2D", "CEIL_2D", "ATT"]
+
+EDGE_WEIGHT_FORMATS = ["FULL_MATRIX", "UPPER_ROW", "LOWER_ROW", "UPPER_DIAG_ROW", "LOWER_DIAG_ROW",
+                       "UPPER_COL", "LOWER_COL", "UPPER_DIAG_COL", "LOWER_DIAG_COL"]
+
+# instances with more cities get lazily computed distances instead of a dense matrix
+MAX_DENSE = 5_000
+
+
+class TspInstance:
+    """
+    Symmetric TSP instance, cities are kept as a compact coordinate array (n, 2)
+    explicit instances keep their distance matrix (and optional display coordinates)
+    """
+
+    def __init__(self, name: str, coordinates: ndarray | None, edge_weight_type: str = "EUC",
+                 matrix: ndarray | None = None):
+        """
+        :param name: name of the instance
+        :param coordinates: coordinates of the cities (n, 2), for GEO latitude and longitude in DDD.MM format
+        :param edge_weight_type: one of EDGE_WEIGHT_TYPES, EUC is exact (not rounded) euclidean distance
+        :param matrix: distance matrix (n, n) of EXPLICIT instances
+        """
+        if edge_weight_type not in EDGE_WEIGHT_TYPES:
+            raise ValueError(f"unknown edge weight type {edge_weight_type}, use one of {EDGE_WEIGHT_TYPES}")
+        self.name: str = name
+        self.edge_weight_type: str = edge_weight_type
+        self.matrix: ndarray | None = matrix
+        self.dimension: int = len(matrix) if matrix is not None else len(coordinates)
+        self.coordinates: ndarray | None = None if coordinates is None else np.asarray(coordinates, dtype=np.float64)
+        if edge_weight_type == "GEO":
+            self.radians: ndarray = self.geographic(self.coordinates)
+
+    @staticmethod
+    def random(cities: int, x_range: tuple[float, float] = (0, 10), y_range: tuple[float, float] = (0, 10)) -> 'TspInstance':
+        """
+        :return: instance with uniformly random cities and exact euclidean distances
+        """
+        coordinates = np.column_stack((np.random.uniform(x_range[0], x_range[1], cities),
+                                       np.random.uniform(y_range[0], y_range[1], cities)))
+        return TspInstance(f"random{cities}", coordinates)
+
+    @staticmethod
+    def geographic(coordinates: ndarray) -> ndarray:
+        # DDD.MM (degrees and minutes) to radians like TSPLIB
+        degrees = np.trunc(coordinates)
+        return 3.141592 * (degrees + 5.0 * (coordinates - degrees) / 3.0) / 180.0
+
+    def distance(self, i, j) -> float | ndarray:
+        """
+        :param i: cities (any shape)
+        :param j: cities (same shape as i)
+        :return: distances between the cities i and j (elementwise)
+        """
+        if self.edge_weight_type == "EXPLICIT":
+            return self.matrix[i, j]
+
+        if self.edge_weight_type == "GEO":
+            a, b = self.radians[i], self.radians[j]
+            q1 = np.cos(a[..., 1] - b[..., 1])
+            q2 = np.cos(a[..., 0] - b[..., 0])
+            q3 = np.cos(a[..., 0] + b[..., 0])
+            distance = np.trunc(6378.388 * np.arccos(np.clip(0.5 * ((1.0 + q1) * q2 - (1.0 - q1) * q3), -1, 1)) + 1.0)
+            return np.where(np.asarray(i) == np.asarray(j), 0.0, distance)
+
+        difference = self.coordinates[i] - self.coordinates[j]
+        squared = np.sum(difference ** 2, axis=-1)
+        if self.edge_weight_type == "ATT":
+            pseudo = np.sqrt(squared / 10.0)
+            rounded = np.floor(pseudo + 0.5)
+            return np.where(rounded < pseudo, rounded + 1, rounded)
+        distance = np.sqrt(squared)
+        if self.edge_weight_type == "EUC_2D":
+            return np.floor(distance + 0.5)
+        if self.edge_weight_type == "CEIL_2D":
+            return np.ceil(distance)
+        return distance
+
+    def distances(self, max_dense: int | None = MAX_DENSE) -> 'ndarray | LazyDistances':
+        """
+        :param max_dense: largest instance with a dense distance matrix, None to always use the dense matrix
+        :return: dense distance matrix (n, n), or LazyDistances computed on demand for larger instances
+        """
+        if self.matrix is not None:
+            return self.matrix
+        if max_dense is not None and self.dimension > max_dense:
+            return LazyDistances(self)
+        return np.concatenate([block for _, _, block in self.blocks()])
+
+    def blocks(self, size: int = 1024):
+        """
+        Rows of the distance matrix computed in blocks, memory stays at size * n
+        :return: generator of (start, stop, distances (stop - start, n))
+        """
+        everyone = np.arange(self.dimension)
+        for start in range(0, self.dimension, size):
+            stop = min(start + size, self.dimension)
+            yield start, stop, self.distance(np.arange(start, stop)[:, np.newaxis], everyone[np.newaxis, :])
+
+    def nearest(self, k: int) -> ndarray:
+        """
+        :return: k nearest cities of every city sorted by distance (n, k)
+        """
+        k = min(k, self.dimension - 1)
+        if self.edge_weight_type in PLANAR:
+            _, indices = KDTree(self.coordinates).query(self.coordinates, k, exclude_self=True)
+            return indices.astype(np.int32)
+
+        nearest = np.empty((self.dimension, k), dtype=np.int32)
+        for start, stop, block in self.blocks():
+            block[np.arange(stop - start), np.arange(start, stop)] = np.inf
+            candidates = np.argpartition(block, k - 1, axis=1)[:, :k]
+            order = np.argsort(np.take_along_axis(block, candidates, axis=1), axis=1, kind="stable")
+            nearest[start:stop] = np.take_along_axis(candidates, order, axis=1)
+        return nearest
+
+    def points(self) -> list[Point]:
+        """
+        :return: cities as Points named by their TSPLIB numbers (from 1), explicit instances without display data at 0, 0
+        """
+        coordinates = self.coordinates if self.coordinates is not None else np.zeros((self.dimension, 2))
+        return [Point(x, y, str(i + 1)) for i, (x, y) in enumerate(coordinates.tolist())]
+
+
+class LazyDistances:
+    """
+    Distance matrix of a large instance which is never materialized
+    indexing [i, j] with cities or arrays of cities computes the distances elementwise
+    """
+
+    def __init__(self, instance: TspInstance):
+        self.instance: TspInstance = instance
+        self.shape: tuple[int, int] = (instance.dimension, instance.dimension)
+        # plain python coordinates for single distances (local search asks for them one by one)
+        self.xy: list[list[float]] | None = (instance.coordinates.tolist() if instance.edge_weight_type in PLANAR
+                                             else None)
+
+    def __getitem__(self, key: tuple) -> float | ndarray:
+        i, j = key
+        if self.xy is not None and isinstance(i, Integral) and isinstance(j, Integral):
+            return self.single(i, j)
+        return self.instance.distance(i, j)
+
+    def single(self, i: int, j: int) -> float:
+        (xi, yi), (xj, yj) = self.xy[i], self.xy[j]
+        distance = math.hypot(xi - xj, yi - yj)
+        edge_weight_type = self.instance.edge_weight_type
+        if edge_weight_type == "EUC_2D":
+            return float(math.floor(distance + 0.5))
+        if edge_weight_type == "CEIL_2D":
+            return float(math.ceil(distance))
+        if edge_weight_type == "ATT":
+            pseudo = distance / math.sqrt(10.0)
+            rounded = math.floor(pseudo + 0.5)
+            return float(rounded + 1 if rounded < pseudo else rounded)
+        return distance
+
+    def __len__(self) -> int:
+        return self.instance.dimension
+
+    def nearest(self, k: int) -> ndarray:
+        return self.instance.nearest(k)
+
+
+def explicit_matrix(weights: ndarray, dimension: int, edge_weight_format: str) -> ndarray:
+    """
+    :param weights: all numbers of EDGE_WEIGHT_SECTION
+    :return: symmetric distance matrix (n, n)
+    """
+    if edge_weight_format not in EDGE_WEIGHT_FORMATS:
+        raise ValueError(f"unknown edge weight format {edge_weight_format}, use one of {EDGE_WEIGHT_FORMATS}")
+    if edge_weight_format == "FULL_MATRIX":
+        return weights[:dimension * dimension].reshape(dimension, dimension)
+
+    # column formats list the same numbers as the row formats of the other triangle
+    edge_weight_format = {"UPPER_COL": "LOWER_ROW", "LOWER_COL": "UPPER_ROW",
+                          "UPPER_DIAG_COL": "LOWER_DIAG_ROW", "LOWER_DIAG_COL": "UPPER_DIAG_ROW"}.get(edge_weight_format,
+                                                                                                     edge_weight_format)
+    diagonal = 0 if "DIAG" in edge_weight_format else 1
+    if edge_weight_format.startswith("UPPER"):
+        rows, columns = np.triu_indices(dimension, diagonal)
+    else:
+        rows, columns = np.tril_indices(dimension, -diagonal)
+    matrix = np.zeros((dimension, dimension))
+    matrix[rows, columns] = weights[:len(rows)]
+    matrix[columns, rows] = weights[:len(rows)]
+    return matrix
+
+
+def load_tsplib(path: str) -> TspInstance:
+    """
+    Load symmetric TSPLIB instance (.tsp) with EUC_2D, CEIL_2D, ATT, GEO or EXPLICIT edge weights
+    :param path: path of the .tsp file
+    """
+    with open(path) as file:
+        lines = file.read().splitlines()
+
+    specification = {}
+    sections = {}
+    section = None
+    for line in lines:
+        line = line.strip()
+        if not line or line == "EOF":
+            continue
+        keyword = line.split(":")[0].strip() if ":" in line else line.split()[0]
+        if keyword.endswith("_SECTION"):
+            section = keyword
+            sections[section] = []
+        elif ":" in line and not line[0].isdigit() and not line[0] in "-+.":
+            specification[keyword] = line.split(":", 1)[1].strip()
+            section = None
+        elif section is not None:
+            sections[section].append(line)
+
+    dimension = int(specification["DIMENSION"])
+    edge_weight_type = specification.get("EDGE_WEIGHT_TYPE", "EUC_2D")
+    if edge_weight_type not in EDGE_WEIGHT_TYPES or edge_weight_type == "EUC":
+        raise ValueError(f"unsupported edge weight type {edge_weight_type}, use one of {EDGE_WEIGHT_TYPES[1:]}")
+
+    def coordinates(name: str) -> ndarray | None:
+        if name not in sections:
+            return None
+        # node number followed by the coordinates, ordered by the node number
+        table = np.array(" ".join(sections[name]).split(), dtype=np.float64).reshape(dimension, -1)
+        return table[np.argsort(table[:, 0], kind="stable"), 1:3]
+
+    if edge_weight_type == "EXPLICIT":
+        weights = np.array(" ".join(sections["EDGE_WEIGHT_SECTION"]).split(), dtype=np.float64)
+        matrix = explicit_matrix(weights, dimension, specification.get("EDGE_WEIGHT_FORMAT", "FULL_MATRIX"))
+        return TspInstance(specification.get("NAME", path), coordinates("DISPLAY_DATA_SECTION"), edge_weight_type, matrix)
+
+    return TspInstance(specification.get("NAME", path), coordinates("NODE_COORD_SECTION"), edge_weight_type)
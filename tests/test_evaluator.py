@@ -0,0 +1,21 @@
+import numpy as np
+
+from src.Functions import Function
+from src.utils.Cache import EvaluationCache
+from src.utils.Evaluator import Evaluator
+
+
+def test_empty_population():
+    sphere = Function(3).sphere
+    for cache in (None, EvaluationCache()):
+        evaluator = Evaluator(sphere, 10, cache)
+        values = evaluator(np.empty((0, 3)))
+        assert values.shape == (0,)
+        assert evaluator.calls == 0
+        assert evaluator.best.value == np.inf
+
+
+def test_empty_population_after_budget():
+    evaluator = Evaluator(Function(3).sphere, 2)
+    evaluator(np.ones((2, 3)))
+    assert evaluator(np.empty((0, 3))).shape == (0,)